@@ -1,21 +1,162 @@
 """
-main module
+main module: command line entry point of the collector
+
+    python . [run]      reconcile trading pairs, discover new pair starts, update candles
+    python . status     reconcile trading pairs only
+    python . discover   find the first trading minute of pairs without a start
+    python . update     fetch new candles of traded pairs
+    python . backfill   scan traded pairs for missing candles and backfill them
+    python . daemon     keep running and collect on a fixed cadence
+    python . live       build live one-minute candles from the trades websocket
+
+every command imports only the modules it runs, so a cron triggered `status`
+starts without pandas, NumPy or aiohttp
 """
-from data_manager import (
-    api_data_manager,
-    status_helper,
-)
+import argparse
+from data_manager import metrics
+
+
+def status(_: argparse.Namespace) -> None:
+    """
+    trading status sweep on DataHelper and the API client alone
+    """
+    from data_manager import status_helper  # pylint: disable=import-outside-toplevel
+    with metrics.get_metrics().span("stage", stage="reconcile"):
+        status_helper.reconcile_pairs()
+
+
+def collect(args: argparse.Namespace) -> None:
+    """
+    runs the stages of `args.command` with a fully loaded APIDataManager
+    """
+    # pylint: disable=import-outside-toplevel
+    from data_manager import status_helper
+    from data_manager.api_data_manager import APIDataManager
+    from data_manager.migrations import ensure_schema
+    registry = metrics.get_metrics()
+    manager = APIDataManager()
+    stages = {
+        "run": ("reconcile", "discover", "update"),
+        "discover": ("discover",),
+        "update": ("update",),
+        "backfill": ("backfill",),
+    }[args.command]
+    runners = {
+        "reconcile": status_helper.reconcile_pairs,
+        "discover": manager.find_starting_timestamp_for_new_pairs,
+        "update": manager.update_candles_for_existing_pairs,
+        "backfill": manager.gap_scanner.run,
+    }
+    try:
+        ensure_schema(manager.data_helper)
+        with registry.span("run", command=args.command):
+            for stage in stages:
+                with registry.span("stage", stage=stage):
+                    runners[stage]()
+        manager.api_client.latency.log_summary()
+    finally:
+        manager.close()
+
+
+def daemon(args: argparse.Namespace) -> None:
+    """
+    collector cycles on minute-aligned ticks until stopped
+    """
+    # pylint: disable=import-outside-toplevel
+    from data_manager import scheduler
+    from data_manager.api_data_manager import APIDataManager
+    from data_manager.migrations import ensure_schema
+    manager = APIDataManager()
+    try:
+        ensure_schema(manager.data_helper)
+        scheduler.Scheduler(manager,
+                            args.interval or scheduler.UPDATE_INTERVAL_MINUTES,
+                            args.status_interval or scheduler.STATUS_INTERVAL_MINUTES,
+                            args.metrics_file).run()
+    finally:
+        manager.close()
+
+
+def live(_: argparse.Namespace) -> None:
+    """
+    live candles of all traded pairs until stopped
+    """
+    # pylint: disable=import-outside-toplevel
+    from data_manager.data_helper import DataHelper
+    from data_manager.live_stream import LiveCandleStream
+    from data_manager.migrations import ensure_schema
+    data_helper = DataHelper()
+    ensure_schema(data_helper)
+    LiveCandleStream.for_traded_pairs(data_helper).run_forever()
+
+
+COMMANDS = {
+    "run": (collect, "reconcile pairs, discover new pair starts and update candles (default)"),
+    "status": (status, "reconcile trading pairs with the API only"),
+    "discover": (collect, "find the first trading minute of pairs without a start"),
+    "update": (collect, "fetch new candles of traded pairs"),
+    "backfill": (collect, "scan traded pairs for missing candles and backfill them"),
+    "daemon": (daemon, "keep running and collect candles on a fixed cadence"),
+    "live": (live, "build live one-minute candles from the trades websocket"),
+}
+
+
+def add_daemon_options(parser: argparse.ArgumentParser, legacy: bool = False) -> None:
+    """
+    daemon cadence options; the hidden top-level copies serve the `--daemon` flag form,
+    the subcommand ones are left out of the namespace unless given, so they do not
+    reset values set before the subcommand
+    """
+    interval_help = "minutes between candle updates (default: UPDATE_INTERVAL_MINUTES or 1)"
+    status_help = ("minutes between trading status sweeps "
+                   "(default: STATUS_INTERVAL_MINUTES or 60)")
+    default = None if legacy else argparse.SUPPRESS
+    parser.add_argument("--interval", type=int, default=default,
+                        help=argparse.SUPPRESS if legacy else interval_help)
+    parser.add_argument("--status-interval", type=int, default=default,
+                        help=argparse.SUPPRESS if legacy else status_help)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    parser with a subcommand per entry of COMMANDS
+    """
+    parser = argparse.ArgumentParser(prog="trading_bot")
+    parser.add_argument("--metrics-file", default=metrics.METRICS_FILE,
+                        help="write Prometheus metrics to this file after every run / cycle")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT,
+                        help="serve Prometheus metrics on this port (0 disables)")
+    parser.add_argument("--profile", choices=metrics.PROFILERS, default=metrics.PROFILER or None,
+                        help="profile the run and write the result to PROFILE_DIR")
+    # flags of the single command line before subcommands
+    parser.add_argument("--daemon", action="store_const", dest="command", const="daemon",
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--live", action="store_const", dest="command", const="live",
+                        help=argparse.SUPPRESS)
+    add_daemon_options(parser, legacy=True)
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, (_, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        if name == "daemon":
+            add_daemon_options(subparser)
+    return parser
 
-APIDataManager = api_data_manager.APIDataManager()
 
 def main():
     """
     main method
     """
-    status_helper.check_for_new_pairs()
-    status_helper.update_disabled_pairs()
-    APIDataManager.find_starting_timestamp_for_new_pairs()
-    APIDataManager.update_candles_for_existing_pairs()
+    args = build_parser().parse_args()
+    args.command = args.command or "run"
+    registry = metrics.get_metrics()
+    if args.metrics_port:
+        registry.serve(args.metrics_port)
+    try:
+        with metrics.profiled("collector", args.profile or ""):
+            COMMANDS[args.command][0](args)
+    finally:
+        if args.metrics_file:
+            registry.write(args.metrics_file)
 
 if __name__ == "__main__":
     main()
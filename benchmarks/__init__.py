@@ -0,0 +1,3 @@
+"""
+benchmarks and local stand-ins for external services
+"""
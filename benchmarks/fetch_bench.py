@@ -0,0 +1,76 @@
+"""
+compares the legacy sequential page loop with AsyncCandleFetcher
+against the local mock OHLC server
+
+    python -m benchmarks.fetch_bench --pairs 50 --pages 4 --latency 0.05
+"""
+
+import argparse
+import time
+import requests
+from data_manager.candle_fetcher import (
+    AsyncCandleFetcher,
+    PAGE_INTERVAL,
+    TokenBucket,
+)
+from benchmarks.mock_bitstamp import MockBitstamp
+
+
+def sequential_fetch(ohlc_url: str, starts: dict[str, int], end: int) -> int:
+    """
+    one blocking request per page, one pair after another (pre-asyncio behaviour)
+    """
+    candles = 0
+    for pair, start in starts.items():
+        while start < end - 60:
+            resp = requests.get(ohlc_url.format(pair_url=pair),
+                                params={"step": 60, "limit": 1000, "start": start},
+                                timeout=(3, None))
+            candles += len(resp.json()["data"]["ohlc"])
+            start += PAGE_INTERVAL
+    return candles
+
+
+def main() -> None:
+    """
+    runs both fetchers and prints elapsed time and candles/sec
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    now = int(time.time()) // 60 * 60
+    start = now - args.pages * PAGE_INTERVAL
+    listings = {f"pair{i}usd": 0 for i in range(args.pairs)}
+    starts = dict.fromkeys(listings, start)
+    with MockBitstamp(listings, now=now, latency=args.latency) as mock:
+        if not args.skip_sequential:
+            began = time.perf_counter()
+            candles = sequential_fetch(mock.ohlc_url, starts, now)
+            elapsed = time.perf_counter() - began
+            print(f"sequential: {candles} candles in {elapsed:.2f}s "
+                  f"({candles / elapsed:,.0f} candles/s)")
+        fetcher = AsyncCandleFetcher(ohlc_url=mock.ohlc_url,
+                                     concurrency=args.concurrency,
+                                     rate_limiter=TokenBucket(args.rate, int(args.rate)))
+        candles = 0
+
+        def count(_: str, ohlc_list: list[dict] | None) -> None:
+            nonlocal candles
+            candles += len(ohlc_list or [])
+
+        began = time.perf_counter()
+        fetcher.stream(starts, now, count)
+        fetcher.close()
+        elapsed = time.perf_counter() - began
+        print(f"async:      {candles} candles in {elapsed:.2f}s "
+              f"({candles / elapsed:,.0f} candles/s, {fetcher.requests_sent} requests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+times the indicator engine over one year of synthetic minutes for many pairs:
+a full computation of every pair's history, then incremental updates that
+only add the newest candles; results are checked against pandas first
+
+    python -m benchmarks.indicator_bench --pairs 220 --days 365 --batch 60
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from data_manager.indicators import IndicatorSet
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+
+def make_year(days: int, start: int = 1_672_531_200, seed: int = 0) -> np.ndarray:
+    """
+    random walk CANDLE_DTYPE candles, one per minute
+    """
+    rng = np.random.default_rng(seed)
+    count = days * 1440
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, count)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0003, count)) * close
+    candles = np.empty(count, dtype=CANDLE_DTYPE)
+    candles["timestamp"] = start + 60 * np.arange(count)
+    candles["open"] = open_
+    candles["close"] = close
+    candles["high"] = np.maximum(open_, close) + spread
+    candles["low"] = np.minimum(open_, close) - spread
+    candles["volume"] = rng.exponential(2.0, count)
+    return candles
+
+
+def pandas_reference(candles: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    the same indicators computed with pandas over the whole history
+    """
+    df = pd.DataFrame({column: candles[column] for column in CANDLE_DTYPE.names})
+    close = df["close"]
+    change = close.diff()
+    gain = change.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    loss = (-change).clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+    previous = close.shift()
+    true_range = pd.concat([df["high"] - df["low"], (df["high"] - previous).abs(),
+                            (df["low"] - previous).abs()], axis=1).max(axis=1)
+    typical = (df["high"] + df["low"] + df["close"]) / 3 * df["volume"]
+    day = df["timestamp"] // 86400
+    return {
+        "sma_20": close.rolling(20).mean().to_numpy(),
+        "sma_200": close.rolling(200).mean().to_numpy(),
+        "ema_12": close.ewm(span=12, adjust=False).mean().to_numpy(),
+        "ema_26": close.ewm(span=26, adjust=False).mean().to_numpy(),
+        "rsi_14": np.concatenate(([np.nan], (100 - 100 / (1 + gain / loss)).to_numpy())),
+        "atr_14": true_range.ewm(alpha=1 / 14, adjust=False).mean().to_numpy(),
+        "bb_upper_20": (close.rolling(20).mean() + 2 * close.rolling(20).std(ddof=0)).to_numpy(),
+        "vwap": (typical.groupby(day).cumsum() / df["volume"].groupby(day).cumsum()).to_numpy(),
+    }
+
+
+def check(candles: np.ndarray, batch: int) -> None:
+    """
+    full and batch-by-batch results must both match pandas
+    """
+    full = IndicatorSet().update(candles)
+    incremental = IndicatorSet()
+    parts = np.concatenate([incremental.update(candles[start:start + batch])
+                            for start in range(0, len(candles), batch)])
+    for name, expected in pandas_reference(candles).items():
+        for label, values in (("full", full[name]), ("incremental", parts[name])):
+            if not np.allclose(values, expected, rtol=1e-8, atol=1e-8, equal_nan=True):
+                worst = np.nanmax(np.abs(values - expected))
+                raise AssertionError(f"{label} {name} differs from pandas by up to {worst}")
+    print(f"indicators match pandas over {len(candles)} candles (batches of {batch})")
+
+
+def main() -> None:
+    """
+    prints full and incremental indicator throughput
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=220)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--batch", type=int, default=60, help="candles per incremental update")
+    parser.add_argument("--updates", type=int, default=100,
+                        help="incremental updates per pair after the full computation")
+    args = parser.parse_args()
+
+    history = make_year(args.days)
+    check(history[:20_000], 97)
+    tail = make_year(1, start=int(history["timestamp"][-1]) + 60, seed=1)
+    batches = [tail[start:start + args.batch]
+               for start in range(0, args.updates * args.batch, args.batch)]
+
+    sets = [IndicatorSet() for _ in range(args.pairs)]
+    started = time.perf_counter()
+    for indicator_set in sets:
+        indicator_set.update(history)
+    full = time.perf_counter() - started
+    candles = args.pairs * len(history)
+    print(f"full: {args.pairs} pairs x {len(history)} candles in {full:.2f}s "
+          f"({candles / full / 1e6:.1f}M candles/s)")
+
+    started = time.perf_counter()
+    for candles_batch in batches:
+        for indicator_set in sets:
+            indicator_set.update(candles_batch)
+    incremental = time.perf_counter() - started
+    print(f"incremental: {len(batches)} updates x {args.pairs} pairs x {args.batch} candles "
+          f"in {incremental:.2f}s ({incremental / len(batches) * 1000:.1f}ms per update of all pairs)")
+    print(f"recomputing a year per update would take {full * 1000:.0f}ms per update of all pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+measures how soon after the end of a minute live bars reach the sink,
+with trades replayed by the local live trades stand-in
+
+    python -m benchmarks.live_bench --pairs 20 --seconds 130 --rate 5 [--db]
+"""
+
+import argparse
+import asyncio
+from data_manager.live_stream import LiveCandleStream
+from benchmarks.mock_live_trades import MockLiveTrades, load_trades, make_trades
+
+
+async def stream_for(stream: LiveCandleStream, seconds: float) -> None:
+    """
+    runs the stream for `seconds`, then stops it
+    """
+    task = asyncio.create_task(stream.run())
+    await asyncio.sleep(seconds)
+    stream.stop()
+    await task
+
+
+def main() -> None:
+    """
+    replays trades to a LiveCandleStream and prints bar flush lag
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=130.0)
+    parser.add_argument("--rate", type=float, default=5.0, help="trades per second per pair")
+    parser.add_argument("--recording", help="JSON lines of recorded trade messages")
+    parser.add_argument("--db", action="store_true",
+                        help="insert bars to DB (pairs must exist in bitstamp_pairs)")
+    args = parser.parse_args()
+
+    if args.db:
+        stream = LiveCandleStream.for_traded_pairs()
+        pair_names = list(stream.pairs)
+    else:
+        pair_names = [f"pair{i}usd" for i in range(args.pairs)]
+    if args.recording:
+        trades = load_trades(args.recording)
+    else:
+        trades = make_trades(pair_names, args.seconds, args.rate)
+    if not args.db:
+        pairs = dict.fromkeys(sorted({trade["pair"] for trade in trades}), 0)
+        stream = LiveCandleStream(pairs, sink=lambda pair, bars: None)
+
+    with MockLiveTrades(trades) as mock:
+        stream.ws_url = mock.url
+        asyncio.run(stream_for(stream, args.seconds))
+        count, total, longest = stream.latency.endpoints.get("bar_flush", (0, 0.0, 0.0))
+        print(f"{mock.sent} trades replayed, {stream.trades_received} received, "
+              f"{stream.bars_flushed} bars flushed")
+        if count:
+            print(f"bar flush lag after minute end: mean {total / count:.3f}s, "
+                  f"max {longest:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+disposable local Postgres for benchmarks: a fresh cluster in a temporary
+directory, reachable only through a unix socket, removed on exit.
+Started with initdb / pg_ctl from PG_BIN or PATH (TimescaleDB is preloaded
+and created when the installation ships it), otherwise with the pgserver package
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+import psycopg
+
+PG_PORT = "5432"
+
+# bitstamp_pairs as created before data_manager.migrations, later columns
+# are added by ensure_schema() / the migrations
+BITSTAMP_PAIRS_SCHEMA = """--sql
+CREATE TABLE IF NOT EXISTS bitstamp_pairs (
+unique_pair_id SERIAL PRIMARY KEY,
+pair TEXT,
+pair_url TEXT UNIQUE,
+trading_enabled BOOLEAN,
+"description" TEXT,
+minimum_order TEXT,
+last_checked_for_trading TIMESTAMPTZ,
+start_timestamp TIMESTAMPTZ,
+unix_timestamp BIGINT
+);
+"""
+
+
+def find_bin_dir() -> Path | None:
+    """
+    directory holding initdb and pg_ctl, None if there is none
+    """
+    if os.getenv("PG_BIN"):
+        return Path(os.environ["PG_BIN"])
+    pg_ctl = shutil.which("pg_ctl")
+    return Path(pg_ctl).parent if pg_ctl else None
+
+
+class LocalPostgres:
+    """
+    context manager around a throwaway cluster; `env` holds the variables
+    DataHelper reads to connect to it
+    """
+    def __init__(self, bin_dir: Path | None = None) -> None:
+        self.bin_dir = bin_dir or find_bin_dir()
+        self.root: Path | None = None
+        self.host = ""
+        self.port = PG_PORT
+        self.timescale = False
+        self._pgserver = None
+
+
+    @property
+    def data_dir(self) -> Path:
+        """
+        cluster data directory
+        """
+        return self.root / "data"
+
+
+    @property
+    def env(self) -> dict[str, str]:
+        """
+        connection settings in the variables DataHelper reads;
+        the password is ignored by trust authentication
+        """
+        return {"DB_HOST": self.host, "DB_PORT": str(self.port), "DB_NAME": "postgres",
+                "PSQL_USER": "postgres", "PSQL_PASSWORD": "benchmark"}
+
+
+    def connect(self) -> psycopg.Connection:
+        """
+        autocommit superuser connection
+        """
+        return psycopg.connect(host=self.host, port=self.port, dbname="postgres",
+                               user="postgres", autocommit=True)
+
+
+    def _has_timescale(self) -> bool:
+        try:
+            sharedir = subprocess.run([self.bin_dir / "pg_config", "--sharedir"],
+                                      capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return False
+        return (Path(sharedir) / "extension" / "timescaledb.control").exists()
+
+
+    def reset(self) -> None:
+        """
+        drops everything and recreates the baseline bitstamp_pairs table
+        """
+        with self.connect() as conn:
+            conn.execute("DROP SCHEMA public CASCADE")
+            conn.execute("CREATE SCHEMA public")
+            if self.timescale:
+                conn.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+            conn.execute(BITSTAMP_PAIRS_SCHEMA)
+
+
+    def __enter__(self) -> "LocalPostgres":
+        self.root = Path(tempfile.mkdtemp(prefix="bench_pg_"))
+        if self.bin_dir is None:
+            self._start_pgserver()
+        else:
+            self._start_cluster()
+        self.reset()
+        return self
+
+
+    def _start_pgserver(self) -> None:
+        try:
+            import pgserver  # pylint: disable=import-outside-toplevel
+        except ImportError as error:
+            raise RuntimeError("No Postgres found: set PG_BIN, put pg_ctl on PATH "
+                               "or install pgserver") from error
+        self._pgserver = pgserver.get_server(self.root / "data", cleanup_mode="delete")
+        info = self._pgserver.get_postmaster_info()
+        self.host, self.port = str(info.socket_dir), info.port
+
+
+    def _start_cluster(self) -> None:
+        self.host = str(self.root)
+        subprocess.run([self.bin_dir / "initdb", "-D", self.data_dir, "-U", "postgres",
+                        "--auth=trust", "-E", "UTF8"], capture_output=True, check=True)
+        self.timescale = self._has_timescale()
+        options = f"-k {self.root} -p {PG_PORT} -c listen_addresses=''"
+        if self.timescale:
+            options += " -c shared_preload_libraries=timescaledb"
+        subprocess.run([self.bin_dir / "pg_ctl", "-D", self.data_dir, "-o", options,
+                        "-l", self.root / "postgres.log", "-w", "start"],
+                       capture_output=True, check=True)
+
+
+    def __exit__(self, *exc) -> None:
+        if self._pgserver is not None:
+            self._pgserver.cleanup()
+        else:
+            subprocess.run([self.bin_dir / "pg_ctl", "-D", self.data_dir, "-m", "immediate",
+                            "stop"], capture_output=True, check=False)
+        shutil.rmtree(self.root, ignore_errors=True)
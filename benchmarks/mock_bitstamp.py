@@ -0,0 +1,189 @@
+"""
+local mock of Bitstamp's OHLC and trading pairs info endpoints:
+serves deterministic one-minute candles for configured pairs
+with optional artificial latency and rate limiting (429),
+so fetchers can be exercised offline
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+OHLC_PATH = "/api/v2/ohlc/"
+PAIRS_PATH = "/api/v2/trading-pairs-info/"
+
+
+def make_candle(pair: str, timestamp: int) -> dict:
+    """
+    deterministic candle for a pair and minute, values are strings like in the real API
+    """
+    base = 100 + (hash(pair) % 1000) + (timestamp // 60) % 500 / 100
+    return {
+        "timestamp": str(timestamp),
+        "open": f"{base:.2f}",
+        "high": f"{base + 0.5:.2f}",
+        "low": f"{base - 0.5:.2f}",
+        "close": f"{base + 0.1:.2f}",
+        "volume": f"{(timestamp // 60) % 97 + 0.12345678:.8f}",
+    }
+
+
+class MockBitstamp:
+    """
+    threaded HTTP server with per-pair listing times;
+    unknown pairs get 404, `latency` seconds are added to every response
+    and every `throttle_every`-th OHLC request (0 = never) gets 429
+    with a Retry-After of `retry_after` seconds
+    """
+    def __init__(self,
+                 listings: dict[str, int],
+                 now: int | None = None,
+                 latency: float = 0.0,
+                 port: int = 0,
+                 throttle_every: int = 0,
+                 retry_after: int = 0) -> None:
+        self.listings = listings
+        self.now = now if now is not None else int(time.time()) // 60 * 60
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.request_count = 0
+        self.ohlc_request_count = 0
+        self.throttled_count = 0
+        self.not_found_count = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+
+    @property
+    def base_url(self) -> str:
+        """
+        root url of the running server
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+    @property
+    def ohlc_url(self) -> str:
+        """
+        OHLC url template in the same format as api_data_manager.OHLC_URL
+        """
+        return self.base_url + OHLC_PATH + "{pair_url}/"
+
+
+    def ohlc(self, pair: str, params: dict[str, list[str]]) -> list[dict]:
+        """
+        candles of `pair` in [start, start + limit * step), capped by listing time and now
+        """
+        step = int(params.get("step", ["60"])[0])
+        limit = int(params.get("limit", ["1"])[0])
+        start = int(params.get("start", [str(self.now - limit * step)])[0])
+        first = max(start, self.listings[pair])
+        first += -first % step
+        end = min(start + limit * step, self.now)
+        return [make_candle(pair, ts) for ts in range(first, end, step)]
+
+
+    def trading_pairs_info(self) -> list[dict]:
+        """
+        pairs info of every listed pair
+        """
+        return [{"name": pair.upper(),
+                 "url_symbol": pair,
+                 "description": f"{pair.upper()} mock pair",
+                 "minimum_order": "10.0",
+                 "trading": "Enabled"}
+                for pair in self.listings]
+
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            routes requests to the mock
+            """
+            def log_message(self, *args) -> None:  # pylint: disable=arguments-differ
+                pass
+
+            def handle(self) -> None:
+                """
+                clients that gave up on a pair may close before the response is sent
+                """
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """
+                serves OHLC pages
+                """
+                url = urlparse(self.path)
+                is_ohlc = url.path.startswith(OHLC_PATH)
+                with mock._lock:  # pylint: disable=protected-access
+                    mock.request_count += 1
+                    if is_ohlc:
+                        mock.ohlc_request_count += 1
+                    throttled = (is_ohlc and mock.throttle_every
+                                 and mock.ohlc_request_count % mock.throttle_every == 0)
+                    if throttled:
+                        mock.throttled_count += 1
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if url.path == PAIRS_PATH:
+                    self._send_pairs_info()
+                    return
+                if throttled:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(mock.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                pair = url.path[len(OHLC_PATH):].strip("/")
+                if not is_ohlc or pair not in mock.listings:
+                    with mock._lock:  # pylint: disable=protected-access
+                        mock.not_found_count += 1
+                    self.send_error(404)
+                    return
+                body = {"data": {"pair": pair.upper(),
+                                 "ohlc": mock.ohlc(pair, parse_qs(url.query))}}
+                self._send_json(body)
+
+            def _send_pairs_info(self) -> None:
+                payload = json.dumps(mock.trading_pairs_info()).encode()
+                etag = f'"{hashlib.md5(payload).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self._send_json(payload, etag)
+
+            def _send_json(self, body, etag: str | None = None) -> None:
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(200)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+    def __enter__(self) -> "MockBitstamp":
+        self._thread.start()
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,145 @@
+"""
+local stand-in for Bitstamp's live trades websocket: replays recorded
+(or synthetic) trades to subscribed clients with timestamps shifted to now,
+so the live candle stream can be exercised offline
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from aiohttp import web
+
+
+def make_trades(pairs: list[str], seconds: float, per_second: float) -> list[dict]:
+    """
+    synthetic recording: random walk trades of every pair,
+    `offset` is seconds since the start of the recording
+    """
+    trades = []
+    for pair in pairs:
+        price = 100.0 + random.random() * 1000
+        offset = 0.0
+        while (offset := offset + random.expovariate(per_second)) < seconds:
+            price *= 1 + random.gauss(0, 0.0005)
+            trades.append({"pair": pair, "offset": offset,
+                           "price": round(price, 2), "amount": round(random.random(), 8)})
+    return sorted(trades, key=lambda trade: trade["offset"])
+
+
+def load_trades(path: str) -> list[dict]:
+    """
+    recording saved as JSON lines of raw websocket trade messages
+    """
+    trades = []
+    with open(path, encoding="utf-8") as recording:
+        for line in recording:
+            message = json.loads(line)
+            if message.get("event") != "trade":
+                continue
+            data = message["data"]
+            trades.append({"pair": message["channel"].removeprefix("live_trades_"),
+                           "offset": int(data["microtimestamp"]) / 1_000_000,
+                           "price": float(data["price"]),
+                           "amount": float(data["amount"])})
+    start = min((trade["offset"] for trade in trades), default=0.0)
+    for trade in trades:
+        trade["offset"] -= start
+    return sorted(trades, key=lambda trade: trade["offset"])
+
+
+class MockLiveTrades:
+    """
+    websocket server on a background thread, every client gets the trades
+    of the channels it subscribed to, paced by their recorded offsets / `speed`
+    """
+    def __init__(self, trades: list[dict], speed: float = 1.0, port: int = 0) -> None:
+        self.trades = trades
+        self.speed = speed
+        self.port = port
+        self.sent = 0
+        self._loop = asyncio.new_event_loop()
+        self._runner: web.AppRunner | None = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+
+    @property
+    def url(self) -> str:
+        """
+        websocket url of the running server
+        """
+        return f"ws://127.0.0.1:{self.port}/"
+
+
+    async def _replay(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        channels: set[str] = set()
+        started = time.time()
+
+        async def receive() -> None:
+            async for message in ws:
+                payload = json.loads(message.data)
+                if payload.get("event") == "bts:subscribe":
+                    channels.add(payload["data"]["channel"])
+                    await ws.send_json({"event": "bts:subscription_succeeded",
+                                        "channel": payload["data"]["channel"], "data": {}})
+
+        receiver = asyncio.create_task(receive())
+        try:
+            for trade_id, trade in enumerate(self.trades):
+                await asyncio.sleep(max(0.0, started + trade["offset"] / self.speed - time.time()))
+                channel = f"live_trades_{trade['pair']}"
+                if channel not in channels or ws.closed:
+                    continue
+                now = time.time()
+                await ws.send_json({"event": "trade", "channel": channel, "data": {
+                    "id": trade_id,
+                    "timestamp": str(int(now)),
+                    "microtimestamp": str(int(now * 1_000_000)),
+                    "amount": trade["amount"],
+                    "price": trade["price"],
+                    "type": 0,
+                }})
+                self.sent += 1
+        except ConnectionResetError:
+            pass
+        finally:
+            receiver.cancel()
+        await ws.close()
+        return ws
+
+
+    def _serve(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_get("/", self._replay)
+        self._runner = web.AppRunner(app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+        self._ready.set()
+        self._loop.run_forever()
+
+
+    def __enter__(self) -> "MockLiveTrades":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+
+    async def _shutdown(self) -> None:
+        await self._runner.cleanup()
+        replays = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in replays:
+            task.cancel()
+        await asyncio.gather(*replays, return_exceptions=True)
+
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,52 @@
+"""
+candles/sec of the legacy per-element apply normalization
+versus ohlc_normalizer on a synthetic API payload
+
+    python -m benchmarks.normalize_bench --candles 1000000
+"""
+
+import argparse
+import time
+import pandas as pd
+from data_manager.ohlc_normalizer import PRICE_COLUMNS, normalize_candles
+from benchmarks.mock_bitstamp import make_candle
+
+
+def legacy_normalize(ohlc_list: list[dict], unique_pair_id: int) -> pd.DataFrame:
+    """
+    normalization as done by update_candles_for_existing_pairs
+    before the vectorized stage
+    """
+    api_df = pd.DataFrame(ohlc_list)
+    api_df["timestamp"] = api_df["timestamp"].astype(int)
+    api_df["timestamp"] = api_df["timestamp"].apply(
+        lambda x: pd.Timestamp(x, unit="s", tz="Europe/Vilnius"))
+    for column in PRICE_COLUMNS:
+        api_df[column] = api_df[column].apply(float)
+    api_df["unique_pair_id"] = unique_pair_id
+    return api_df
+
+
+def main() -> None:
+    """
+    prints candles/sec of both implementations
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candles", type=int, default=500_000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    payload = [make_candle("btcusd", 1_700_000_000 + 60 * i) for i in range(args.candles)]
+    runs = [("vectorized", normalize_candles)]
+    if not args.skip_legacy:
+        runs.insert(0, ("legacy", legacy_normalize))
+    for name, normalize in runs:
+        began = time.perf_counter()
+        normalize(payload, 1)
+        elapsed = time.perf_counter() - began
+        print(f"{name:>10}: {args.candles} candles in {elapsed:.2f}s "
+              f"({args.candles / elapsed:,.0f} candles/s)")
+
+
+if __name__ == "__main__":
+    main()
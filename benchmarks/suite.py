@@ -0,0 +1,493 @@
+"""
+end-to-end benchmark scenarios against the local mock Bitstamp API
+and a disposable local Postgres, runnable offline:
+
+    catch_up   enabled pairs a few pages behind, some of them delisted (404)
+    new_pairs  pairs that appear in trading pairs info: reconcile,
+               discover their start and backfill their history
+    discovery  start date discovery of pairs listed at random times
+    migrations every migration in order over NUMERIC pair tables with duplicate
+               candles, then an update on the resulting consolidated storage
+
+every scenario runs in its own process on the baseline schema and reports elapsed time, candles/s,
+API calls (429 and 404 responses included), DB round trips, connections
+opened and peak RSS; startup of the collector command line is timed separately
+(`status` against the mock, and a full import for comparison) together with
+the heavy modules it loaded. With --baseline the run fails on regressions
+
+    python -m benchmarks.suite --pairs 220 --pages 3 --latency 0.02 --throttle-every 50
+    python -m benchmarks.suite --json results.json
+    python -m benchmarks.suite --baseline results.json --tolerance 0.25
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.local_postgres import LocalPostgres
+from benchmarks.mock_bitstamp import MockBitstamp
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_INTERVAL = 1000 * 60
+# first minute start discovery searches from, see data_manager.start_discovery
+EARLIEST_SEARCH_TIMESTAMP = 1726292210
+# metrics where a higher value is a regression
+LOWER_IS_BETTER = ("api_calls", "db_round_trips", "connections", "peak_rss_mb")
+# modules a status-only run must not import
+HEAVY_MODULES = ("pandas", "numpy", "aiohttp")
+# startup measurements: command line after the interpreter
+STARTUP_COMMANDS = {
+    "status": [str(ROOT), "status"],
+    "full_import": ["-c", "import data_manager.api_data_manager"],
+}
+
+
+def catch_up_spec(args: argparse.Namespace, now: int) -> dict:
+    """
+    traded pairs `pages` pages behind now plus `delisted` pairs the API no longer knows
+    """
+    listing = now - 365 * 86400
+    next_candle = now - args.pages * PAGE_INTERVAL
+    pairs = [f"pair{i:03d}usd" for i in range(args.pairs)]
+    gone = [f"gone{i:03d}usd" for i in range(args.delisted)]
+    return {"listings": dict.fromkeys(pairs, listing),
+            "db_pairs": [{"pair": pair, "start": listing, "last_candle": next_candle - 60}
+                         for pair in pairs + gone],
+            "steps": ["update"]}
+
+
+def new_pairs_spec(args: argparse.Namespace, now: int) -> dict:
+    """
+    pairs listed `history_days` ago that DB does not know yet
+    """
+    listing = (now - args.history_days * 86400) // 60 * 60
+    pairs = [f"new{i:03d}usd" for i in range(args.new_pairs)]
+    return {"listings": dict.fromkeys(pairs, listing),
+            "db_pairs": [],
+            "steps": ["reconcile", "discover", "update"],
+            "expected_starts": dict.fromkeys(pairs, listing)}
+
+
+def discovery_spec(args: argparse.Namespace, now: int) -> dict:
+    """
+    pairs on DB without a start timestamp, listed at random minutes since the search start
+    """
+    rng = random.Random(0)
+    listings = {f"disc{i:03d}usd": rng.randrange(EARLIEST_SEARCH_TIMESTAMP, now) // 60 * 60
+                for i in range(args.discovery_pairs)}
+    return {"listings": listings,
+            "db_pairs": [{"pair": pair, "start": None, "last_candle": None} for pair in listings],
+            "steps": ["discover"],
+            "expected_starts": listings}
+
+
+def migrations_spec(args: argparse.Namespace, now: int) -> dict:
+    """
+    pairs stored by the original collector `history_days` of history and `pages` pages
+    behind now, migrated to consolidated storage and then updated
+    """
+    listing = (now - args.history_days * 86400) // 60 * 60
+    pairs = [f"old{i:03d}usd" for i in range(args.legacy_pairs)]
+    return {"listings": dict.fromkeys(pairs, listing),
+            "db_pairs": [],
+            "legacy": {"pairs": pairs, "start": listing, "end": now - args.pages * PAGE_INTERVAL},
+            "env": {"OHLC_STORAGE": "consolidated"},
+            "steps": ["migrate", "update"]}
+
+
+SCENARIOS = {
+    "catch_up": catch_up_spec,
+    "new_pairs": new_pairs_spec,
+    "discovery": discovery_spec,
+    "migrations": migrations_spec,
+}
+
+
+class RoundTrips:
+    """
+    counts statements, COPYs and new connections of psycopg in this process
+    """
+    def __init__(self) -> None:
+        self.counts = {"db_round_trips": 0, "connections": 0}
+
+
+    def install(self) -> None:
+        """
+        wraps the psycopg entry points, behaviour is unchanged
+        """
+        import psycopg  # pylint: disable=import-outside-toplevel
+        for name in ("execute", "executemany", "copy"):
+            self._count(psycopg.Cursor, name, "db_round_trips")
+        connect = psycopg.Connection.connect.__func__
+        counts = self.counts
+
+        def counted_connect(cls, *args, **kwargs):
+            counts["connections"] += 1
+            return connect(cls, *args, **kwargs)
+
+        psycopg.Connection.connect = classmethod(counted_connect)
+
+
+    def _count(self, cls, name: str, key: str) -> None:
+        original = getattr(cls, name)
+        counts = self.counts
+
+        @functools.wraps(original)
+        def counted(*args, **kwargs):
+            counts[key] += 1
+            return original(*args, **kwargs)
+
+        setattr(cls, name, counted)
+
+
+    def reset(self) -> None:
+        """
+        starts counting from zero
+        """
+        self.counts.update(dict.fromkeys(self.counts, 0))
+
+
+def seed(db_pairs: list[dict]) -> None:
+    """
+    inserts the scenario's pairs into bitstamp_pairs and creates their candle tables
+    """
+    # pylint: disable=import-outside-toplevel
+    from data_manager.data_helper import DataHelper
+    data_helper = DataHelper()
+    insert_query = """--sql
+    INSERT INTO bitstamp_pairs(pair, pair_url, trading_enabled, "description", minimum_order,
+                               start_timestamp, unix_timestamp, last_candle_unix)
+    VALUES (upper(%(pair)s), %(pair)s, TRUE, 'benchmark pair', '10.0',
+            to_timestamp(%(start)s), %(start)s, %(last_candle)s);
+    """
+    with data_helper.unit_of_work(), data_helper.connection() as conn:
+        cur = conn.cursor()
+        for row in db_pairs:
+            cur.execute(insert_query, row)
+            data_helper.create_new_pair_table(conn, row["pair"])
+
+
+def seed_legacy(legacy: dict) -> None:
+    """
+    bitstamp_pairs rows and pair tables as the original collector created them:
+    NUMERIC prices, no unique "timestamp" index and every tenth candle stored twice
+    """
+    # pylint: disable=import-outside-toplevel
+    from psycopg import sql
+    from data_manager.data_helper import DataHelper
+    data_helper = DataHelper()
+    insert_query = """--sql
+    INSERT INTO bitstamp_pairs(pair, pair_url, trading_enabled, "description", minimum_order,
+                               start_timestamp, unix_timestamp)
+    VALUES (upper(%(pair)s), %(pair)s, TRUE, 'benchmark pair', '10.0',
+            to_timestamp(%(start)s), %(start)s)
+    RETURNING unique_pair_id;
+    """
+    create_table_query = """--sql
+    CREATE TABLE {} (
+    unique_pair_id INT,
+    "timestamp" TIMESTAMPTZ not null,
+    "open" NUMERIC(20, 12),
+    high NUMERIC(20, 12),
+    low NUMERIC(20, 12),
+    "close" NUMERIC(20, 12),
+    volume NUMERIC(28, 12)
+    );
+    """
+    candles_query = """--sql
+    INSERT INTO {}
+    SELECT %(pair_id)s, to_timestamp(minute), 1.0, 1.5, 0.5, 1.0, 10.0
+    FROM generate_series(%(start)s::BIGINT, %(end)s::BIGINT - 60, %(step)s) AS minute;
+    """
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        timescale = data_helper.has_timescale(conn)
+        for pair in legacy["pairs"]:
+            table = sql.Identifier(f"ohlc_{pair}")
+            cur.execute(insert_query, {"pair": pair, "start": legacy["start"]})
+            pair_id = cur.fetchone()[0]
+            cur.execute(sql.SQL(create_table_query).format(table))
+            if timescale:
+                cur.execute("SELECT create_hypertable(%s, by_range('timestamp'))",
+                            (f"ohlc_{pair}",))
+            for step in (60, 600):
+                cur.execute(sql.SQL(candles_query).format(table),
+                            {"pair_id": pair_id, "start": legacy["start"],
+                             "end": legacy["end"], "step": step})
+
+
+def migrate() -> list[str]:
+    """
+    runs every migration in their documented order, then the startup schema check
+    """
+    # pylint: disable=import-outside-toplevel
+    from data_manager.migrations import MIGRATIONS, ensure_schema
+    for migration in MIGRATIONS.values():
+        migration()
+    ensure_schema()
+    return list(MIGRATIONS)
+
+
+def stored_candles() -> int:
+    """
+    candles in the tables of all pairs
+    """
+    # pylint: disable=import-outside-toplevel
+    from psycopg import sql
+    from data_manager.data_helper import DataHelper
+    data_helper = DataHelper()
+    total = 0
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT pair_url FROM bitstamp_pairs")
+        for (pair,) in cur.fetchall():
+            relation, condition = data_helper.candle_source(pair)
+            cur.execute(sql.SQL("SELECT count(*) FROM {} WHERE {}").format(relation, condition))
+            total += cur.fetchone()[0]
+    return total
+
+
+def run_child(spec_path: str) -> None:
+    """
+    scenario process: seeds DB, runs the steps and prints metrics as JSON
+    """
+    # pylint: disable=import-outside-toplevel
+    spec = json.loads(Path(spec_path).read_text(encoding="utf-8"))
+    round_trips = RoundTrips()
+    round_trips.install()
+    from data_manager import api_data_manager, status_helper
+    from data_manager.migrations import ensure_schema
+    if "legacy" in spec:
+        seed_legacy(spec["legacy"])
+    else:
+        ensure_schema()
+        seed(spec["db_pairs"])
+    manager = api_data_manager.APIDataManager()
+    round_trips.reset()
+    steps = {
+        "migrate": migrate,
+        "reconcile": status_helper.reconcile_pairs,
+        "discover": manager.find_starting_timestamp_for_new_pairs,
+        "update": manager.update_candles_for_existing_pairs,
+    }
+    started = time.perf_counter()
+    results = {step: steps[step]() for step in spec["steps"]}
+    elapsed = time.perf_counter() - started
+    manager.close()
+    metrics = {"elapsed": elapsed, **round_trips.counts,
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    metrics["candles"] = stored_candles()
+    if "expected_starts" in spec:
+        found = results.get("discover") or {}
+        metrics["starts_correct"] = sum(found.get(pair) == start
+                                        for pair, start in spec["expected_starts"].items())
+        metrics["starts_expected"] = len(spec["expected_starts"])
+    print(json.dumps(metrics))
+
+
+def run_scenario(name: str,
+                 args: argparse.Namespace,
+                 postgres: LocalPostgres,
+                 workdir: Path) -> dict:
+    """
+    runs one scenario in a fresh process against a freshly reset DB
+    """
+    now = int(time.time()) // 60 * 60
+    spec = SCENARIOS[name](args, now)
+    spec_path = workdir / f"{name}.json"
+    spec_path.write_text(json.dumps(spec), encoding="utf-8")
+    postgres.reset()
+    with MockBitstamp(spec["listings"], now=now, latency=args.latency,
+                      throttle_every=args.throttle_every) as mock:
+        env = {**os.environ, **postgres.env, **spec.get("env", {}),
+               "BITSTAMP_API_URL": mock.base_url + "/api/v2",
+               "BITSTAMP_REQUEST_RATE": str(args.rate),
+               "BITSTAMP_REQUEST_BURST": str(int(args.rate)),
+               "START_DATES_CACHE": str(workdir / f"{name}_start_dates.csv"),
+               "PAIRS_SNAPSHOT_CACHE": str(workdir / f"{name}_pairs_info.json"),
+               "PAIRS_SNAPSHOT_TTL": "0"}
+        env.pop("CANDLE_CACHE_DIR", None)
+        log_path = workdir / f"{name}.log"
+        with log_path.open("w", encoding="utf-8") as log:
+            child = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--child", spec_path],
+                                   env=env, stdout=subprocess.PIPE, stderr=log, text=True,
+                                   check=False)
+        if child.returncode:
+            raise RuntimeError(f"{name} failed, log:\n"
+                               + "\n".join(log_path.read_text(encoding="utf-8").splitlines()[-20:]))
+        metrics = json.loads(child.stdout.strip().splitlines()[-1])
+        metrics.update({"api_calls": mock.request_count, "throttled": mock.throttled_count,
+                        "not_found": mock.not_found_count})
+    metrics["candles_per_s"] = metrics["candles"] / metrics["elapsed"] if metrics["elapsed"] else 0.0
+    return metrics
+
+
+def time_startup(command: list[str], env: dict[str, str], runs: int) -> dict:
+    """
+    median wall and import seconds of `runs` fresh interpreters running `command`,
+    and the heavy modules they imported
+    """
+    walls, imports = [], []
+    heavy: set[str] = set()
+    for _ in range(runs):
+        started = time.perf_counter()
+        child = subprocess.run([sys.executable, "-X", "importtime", *command], env=env,
+                               cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, check=False)
+        walls.append(time.perf_counter() - started)
+        if child.returncode:
+            raise RuntimeError(f"{' '.join(command)} failed:\n{child.stderr[-2000:]}")
+        # "import time: self [us] | cumulative | module", top-level modules are not indented
+        lines = [line.split("|") for line in child.stderr.splitlines()
+                 if line.startswith("import time:") and not line.endswith("| imported package")]
+        imports.append(sum(int(self_us.split(":")[1]) for self_us, _, _ in lines) / 1e6)
+        heavy |= {name.strip() for _, _, name in lines if name.strip() in HEAVY_MODULES}
+    return {"seconds": statistics.median(walls), "import_seconds": statistics.median(imports),
+            "heavy_modules": sorted(heavy)}
+
+
+def run_startup(args: argparse.Namespace, postgres: LocalPostgres, workdir: Path) -> dict:
+    """
+    times the collector start in fresh processes; the status command runs
+    against the mock once before timing, so timed runs reconcile an unchanged DB
+    """
+    postgres.reset()
+    now = int(time.time()) // 60 * 60
+    listings = {f"pair{i:03d}usd": now - 365 * 86400 for i in range(args.pairs)}
+    with MockBitstamp(listings, now=now, latency=args.latency) as mock:
+        env = {**os.environ, **postgres.env,
+               "BITSTAMP_API_URL": mock.base_url + "/api/v2",
+               "PAIRS_SNAPSHOT_CACHE": str(workdir / "startup_pairs_info.json"),
+               "PAIRS_SNAPSHOT_TTL": "0"}
+        env.pop("CANDLE_CACHE_DIR", None)
+        time_startup(STARTUP_COMMANDS["status"], env, 1)
+        return {name: time_startup(command, env, args.startup_runs)
+                for name, command in STARTUP_COMMANDS.items()}
+
+
+def report(results: dict[str, dict]) -> None:
+    """
+    prints one line per scenario
+    """
+    print(f"{'scenario':<10} {'seconds':>8} {'candles':>9} {'candles/s':>10} {'API':>6} "
+          f"{'429':>5} {'404':>5} {'DB trips':>9} {'conns':>6} {'RSS MB':>7}  starts")
+    for name, metrics in results.items():
+        starts = (f"{metrics['starts_correct']}/{metrics['starts_expected']}"
+                  if "starts_expected" in metrics else "-")
+        print(f"{name:<10} {metrics['elapsed']:>8.2f} {metrics['candles']:>9} "
+              f"{metrics['candles_per_s']:>10,.0f} {metrics['api_calls']:>6} "
+              f"{metrics['throttled']:>5} {metrics['not_found']:>5} "
+              f"{metrics['db_round_trips']:>9} {metrics['connections']:>6} "
+              f"{metrics['peak_rss_mb']:>7.0f}  {starts}")
+
+
+def report_startup(startup: dict[str, dict]) -> None:
+    """
+    prints one line per startup measurement
+    """
+    print(f"{'startup':<12} {'seconds':>8} {'imports':>8}  heavy modules")
+    for name, metrics in startup.items():
+        print(f"{name:<12} {metrics['seconds']:>8.3f} {metrics['import_seconds']:>8.3f}  "
+              f"{', '.join(metrics['heavy_modules']) or '-'}")
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """
+    metrics that got worse than the baseline by more than `tolerance` (a fraction)
+    """
+    found = []
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if metrics["candles_per_s"] < previous["candles_per_s"] * (1 - tolerance):
+            found.append(f"{name}: candles/s {previous['candles_per_s']:,.0f} "
+                         f"-> {metrics['candles_per_s']:,.0f}")
+        for key in LOWER_IS_BETTER:
+            if key in previous and metrics[key] > previous[key] * (1 + tolerance):
+                found.append(f"{name}: {key} {previous[key]:,.0f} -> {metrics[key]:,.0f}")
+        if metrics.get("starts_correct", 0) < previous.get("starts_correct", 0):
+            found.append(f"{name}: correct start dates {previous['starts_correct']} "
+                         f"-> {metrics['starts_correct']}")
+    return found
+
+
+def startup_regressions(startup: dict[str, dict], baseline: dict[str, dict],
+                        tolerance: float) -> list[str]:
+    """
+    slower starts than the baseline by more than `tolerance`
+    and heavy modules a status-only run started to import
+    """
+    found = []
+    for name, metrics in startup.items():
+        previous = baseline.get(name)
+        if previous is not None and metrics["seconds"] > previous["seconds"] * (1 + tolerance):
+            found.append(f"startup {name}: {previous['seconds']:.3f}s -> {metrics['seconds']:.3f}s")
+    if startup.get("status", {}).get("heavy_modules"):
+        found.append(f"startup status imports {', '.join(startup['status']['heavy_modules'])}")
+    return found
+
+
+def main() -> None:
+    """
+    runs the selected scenarios and reports (and optionally checks) their metrics
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--pairs", type=int, default=220, help="catch_up pairs")
+    parser.add_argument("--pages", type=int, default=3, help="catch_up pages behind per pair")
+    parser.add_argument("--delisted", type=int, default=5, help="catch_up pairs answering 404")
+    parser.add_argument("--new-pairs", type=int, default=20)
+    parser.add_argument("--history-days", type=int, default=3, help="history of new pairs")
+    parser.add_argument("--discovery-pairs", type=int, default=50)
+    parser.add_argument("--legacy-pairs", type=int, default=20,
+                        help="migrations pairs in the original schema")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock seconds per response")
+    parser.add_argument("--throttle-every", type=int, default=50,
+                        help="mock answers every n-th OHLC request with 429 (0 = never)")
+    parser.add_argument("--rate", type=float, default=500.0, help="client requests per second")
+    parser.add_argument("--startup-runs", type=int, default=5,
+                        help="timed collector starts per command (0 = skip startup)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.child:
+        run_child(args.child)
+        return
+
+    results: dict[str, dict] = {}
+    startup: dict[str, dict] = {}
+    with LocalPostgres() as postgres, tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        print(f"local Postgres {'with' if postgres.timescale else 'without'} TimescaleDB")
+        for name in args.scenarios:
+            results[name] = run_scenario(name, args, postgres, Path(workdir))
+        if args.startup_runs:
+            startup = run_startup(args, postgres, Path(workdir))
+    report(results)
+    if startup:
+        report_startup(startup)
+    if args.json:
+        Path(args.json).write_text(json.dumps({**results, "startup": startup}, indent=2),
+                                   encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        found = regressions(results, baseline, args.tolerance)
+        found += startup_regressions(startup, baseline.get("startup", {}), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
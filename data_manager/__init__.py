@@ -1,8 +1,13 @@
 """
-data collector init
+data collector init;
+submodules are imported on first use, so a command only pays for what it needs
 """
-from . import (
-        api_data_manager,
-        data_helper,
-        status_helper
-)
+import importlib
+
+__all__ = ["api_data_manager", "data_helper", "status_helper"]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,199 @@
+"""
+shared Bitstamp API client: one pooled keep-alive session for the process,
+compressed responses, retries with jittered exponential backoff
+on 429 / 5xx and per-endpoint latency timing
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from loguru import logger
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from data_manager.metrics import get_metrics
+
+load_dotenv()
+
+metrics = get_metrics()
+
+API_BASE_URL = os.getenv("BITSTAMP_API_URL", "https://www.bitstamp.net/api/v2").rstrip("/")
+OHLC_URL = API_BASE_URL + "/ohlc/{pair_url}/"
+API_PAIRS_URL = API_BASE_URL + "/trading-pairs-info/"
+HTTP_POOL_SIZE = int(os.getenv("BITSTAMP_HTTP_POOL_SIZE", "16"))
+PAIRS_SNAPSHOT_CACHE = Path(os.getenv(
+    "PAIRS_SNAPSHOT_CACHE",
+    Path(__file__).resolve().parent.parent / ".cache" / "trading_pairs_info.json"))
+PAIRS_SNAPSHOT_TTL = int(os.getenv("PAIRS_SNAPSHOT_TTL", "300"))
+MAX_RETRIES = 5
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_BACKOFF = 30.0
+
+
+def backoff_delay(attempt: int, retry_after: str | None = None) -> float:
+    """
+    seconds to wait before retry number `attempt` (0 based):
+    Retry-After if the server sent one, otherwise exponential backoff with full jitter
+    """
+    if retry_after and retry_after.isdigit():
+        return min(MAX_BACKOFF, float(retry_after))
+    return random.uniform(0, min(MAX_BACKOFF, 0.5 * 2 ** attempt))
+
+
+class LatencyStats:
+    """
+    thread-safe request count, total and max latency per endpoint
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.endpoints: dict[str, list[float]] = {}
+
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        """
+        adds a single request duration
+        """
+        with self._lock:
+            stats = self.endpoints.setdefault(endpoint, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+
+    def log_summary(self) -> None:
+        """
+        logs count / mean / max latency of every endpoint
+        """
+        with self._lock:
+            for endpoint, (count, total, longest) in sorted(self.endpoints.items()):
+                logger.info(f"{endpoint}: {int(count)} requests, "
+                            f"mean {total / count * 1000:.1f} ms, max {longest * 1000:.1f} ms")
+
+
+class BitstampClient:
+    """
+    blocking API client around a single requests.Session
+    """
+    def __init__(self,
+                 pool_size: int = HTTP_POOL_SIZE,
+                 max_retries: int = MAX_RETRIES,
+                 timeout: tuple[float, float | None] = (3, 30)) -> None:
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.latency = LatencyStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/json",
+                                     "Accept-Encoding": "gzip, deflate"})
+
+
+    def get(self,
+            url: str,
+            endpoint: str,
+            params: dict | None = None,
+            headers: dict | None = None) -> requests.Response:
+        """
+        GET with retries on 429 / 5xx and connection errors,
+        raises requests.HTTPError for any other bad status
+        """
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                resp = self.session.get(url, params=params, headers=headers,
+                                        timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                metrics.inc("api_calls_total", endpoint=endpoint, status="error")
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{endpoint}: {error!r}, retrying in {delay:.2f}s")
+            else:
+                elapsed = time.perf_counter() - started
+                self.latency.record(endpoint, elapsed)
+                metrics.observe("api_request", elapsed, endpoint=endpoint)
+                metrics.inc("api_calls_total", endpoint=endpoint, status=resp.status_code)
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    resp.raise_for_status()
+                    return resp
+                delay = backoff_delay(attempt, resp.headers.get("Retry-After"))
+                logger.warning(f"{endpoint}: status {resp.status_code}, retrying in {delay:.2f}s")
+            metrics.inc("api_retries_total", endpoint=endpoint)
+            time.sleep(delay)
+            attempt += 1
+
+
+    def get_ohlc(self, pair: str, start: int, limit: int = 1000, step: int = 60) -> list[dict]:
+        """
+        one page of candles of a pair
+        """
+        resp = self.get(OHLC_URL.format(pair_url=pair), "ohlc",
+                        params={"step": step, "limit": limit, "start": start})
+        return resp.json()["data"]["ohlc"]
+
+
+    def get_trading_pairs_info(self) -> list[dict]:
+        """
+        all pairs currently listed on the exchange
+        """
+        return self.get(API_PAIRS_URL, "trading-pairs-info").json()
+
+
+    def get_trading_pairs_snapshot(self,
+                                   cache_path: Path = PAIRS_SNAPSHOT_CACHE,
+                                   ttl: int = PAIRS_SNAPSHOT_TTL) -> list[dict]:
+        """
+        trading pairs info cached on disk: reused without a request while
+        younger than `ttl` seconds, afterwards revalidated with
+        If-None-Match / If-Modified-Since, so an unchanged list is not downloaded again
+        """
+        cached: dict | None = None
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+            if time.time() - cached["fetched_at"] < ttl:
+                return cached["pairs"]
+        except (OSError, ValueError, KeyError, TypeError):
+            cached = None
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        resp = self.get(API_PAIRS_URL, "trading-pairs-info", headers=headers)
+        if resp.status_code == 304 and cached:
+            logger.info("Trading pairs info not modified since the last download")
+            pairs = cached["pairs"]
+        else:
+            pairs = resp.json()
+        snapshot = {
+            "fetched_at": time.time(),
+            "etag": resp.headers.get("ETag", cached and cached.get("etag")),
+            "last_modified": resp.headers.get("Last-Modified",
+                                              cached and cached.get("last_modified")),
+            "pairs": pairs,
+        }
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(snapshot), encoding="utf-8")
+        tmp_path.replace(cache_path)
+        return pairs
+
+
+_client: BitstampClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> BitstampClient:
+    """
+    process-wide client, so every module shares the same warm connections
+    """
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        if _client is None:
+            _client = BitstampClient()
+        return _client
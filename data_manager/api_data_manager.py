@@ -4,170 +4,118 @@ as new historical data becomes available with time passing
 """
 
 import os
+import time
 from datetime import datetime
 from loguru import logger
-import requests
 from dotenv import load_dotenv
-import pandas as pd
+from data_manager.api_client import OHLC_URL, get_client
 from data_manager.data_helper import DataHelper
+from data_manager.candle_fetcher import AsyncCandleFetcher
+from data_manager.gap_scanner import GapScanner
+from data_manager.indicators import IndicatorEngine
+from data_manager.metrics import get_metrics
+from data_manager.ohlc_normalizer import array_to_df, candles_to_array
+from data_manager.start_discovery import StartDiscovery
 
 load_dotenv()
 
-OHLC_URL="https://www.bitstamp.net/api/v2/ohlc/{pair_url}/"
-FOUR_MONTH_INTERVAL = 60 * 60 * 24 * 7 * 4 * 4
-FOUR_WEEK_INTERVAL = 60 * 60 * 24 * 7 * 4
-ONE_WEEK_INTERVAL = 60 * 60 * 24 * 7
-ONE_DAY_INTERVAL = 60 * 60 * 24
-ONE_HOUR_INTERVAL = 60 * 60
-ONE_MINUTE_INTERVAL = 60
+metrics = get_metrics()
 
-curr_time: datetime = datetime.now()
-cur_unix_time: int = int(datetime.timestamp(curr_time))
+# opt-in: latest values are exported as indicator_value gauges,
+# the first update of a pair in a process reads a warm-up window
+COMPUTE_INDICATORS = os.getenv("COMPUTE_INDICATORS", "false").lower() == "true"
+
+
+def current_unix_time() -> int:
+    """
+    evaluated on every call, module level timestamps would freeze at import time
+    """
+    return int(time.time())
 
-# DataHelper = DataHelper()
 
 class APIDataManager:
     """
     placeholder
     """
     def __init__(self) -> None:
-        # pylint: disable=unnecessary-lambda-assignment
-        # pylint: disable=unnecessary-lambda
-        # lambdas are assigned to variables in this case because
-        # it allows the use of "apply" for pandas dataframes
-        self.to_int = lambda x: int(x)
-        self.to_float = lambda x: float(x)
-        self.to_timestamp = lambda x: pd.Timestamp(x, unit="s", tz="Europe/Vilnius")
-        self.to_unix = lambda x: int(datetime.timestamp(x))
-        self.url_dict = {
-            "username": os.getenv("PSQL_USER"),
-            "password": os.getenv("PSQL_PASSWORD"),
-            "host": os.getenv("DB_HOST"),
-            "port": os.getenv("DB_PORT"),
-            "database": os.getenv("DB_NAME"),
-        }
-        self.psycopg_conn_str = f"""dbname={self.url_dict['database']}
-                               user={self.url_dict['username']}
-                               password={self.url_dict['password']}
-                               host={self.url_dict['host']}
-                               port={self.url_dict['port']}"""
-
-
-    def get_new_candles(self, pair) -> pd.DataFrame|None:
+        self.api_client = get_client()
+        self.candle_fetcher = AsyncCandleFetcher(ohlc_url=OHLC_URL,
+                                                 latency=self.api_client.latency)
+        self.data_helper = DataHelper()
+        self.start_discovery = StartDiscovery(self.candle_fetcher)
+        self.gap_scanner = GapScanner(self.data_helper, self.candle_fetcher)
+        self.indicators = IndicatorEngine(self.data_helper) if COMPUTE_INDICATORS else None
+        # {pair_url: (unique_pair_id, next candle)}, kept between updates
+        # so a long running process reads DB checkpoints only once
+        self.checkpoints: dict[str, tuple[int, int]] | None = None
+
+
+    def close(self) -> None:
         """
-        placeholder
+        releases the candle fetcher's event loop and HTTP session
         """
-        start_df = DataHelper().retrieve_df_with_last_candle(pair)
-        start: int = start_df["unix_timestamp"].values[0]
-        ohlc_list: list[dict] = []
-        while start < cur_unix_time - 60:
-            try:
-                resp = requests.get(
-                    OHLC_URL.format(pair_url=pair),
-                    params={
-                        "step": 60,
-                        "limit": 1000,
-                        "start": start,
-                        "exclude_current_candle": True,
-                    },
-                    timeout=(3, None)
-                )
-                resp.raise_for_status()
-            except requests.exceptions.HTTPError:
-                logger.error(f"Bad status code for {pair}")
-                if resp.status_code == 404:
-                    logger.info(f"Setting pair {pair} trading status to \
-                    DISABLED")
-                    DataHelper().disable_trading_on_db(pair)
-                    DataHelper().update_check_time(pair)
-                    return None
-            results = resp.json()["data"]["ohlc"]
-            ohlc_list.extend(results)
-            start = start + 60000
-        api_df = pd.DataFrame(ohlc_list)
-        api_df["timestamp"] = api_df["timestamp"].astype(int)
-        api_df["timestamp"] = api_df["timestamp"].apply(
-            lambda x: pd.Timestamp(x, unit="s", tz="Europe/Vilnius"))
-        return api_df
+        self.candle_fetcher.close()
 
 
-    def update_candles_for_existing_pairs(self):
+    def reset_checkpoints(self) -> None:
         """
-        gets existing pairs from DB where trading_status = Enabled,
-        updates last existing candle's timestamp to set start for API call,
-        iterates through each pair to retrieve new candles from API,
-        updates DB pair tables with new candles,
-        updates main table with check time
+        forgets cached checkpoints, the next update reads them from DB again
         """
-        pairs_df = DataHelper().retrieve_traded_pairs_from_db
-        for row in pairs_df.iterrows():
-            pair_url = row[1].values[1]
-            new_ohlc_df = self.get_new_candles(pair=pair_url)
-            if new_ohlc_df is not None:
-                new_ohlc_df["high"] = new_ohlc_df["high"].apply(self.to_float)
-                new_ohlc_df["open"] = new_ohlc_df["open"].apply(self.to_float)
-                new_ohlc_df["low"] = new_ohlc_df["low"].apply(self.to_float)
-                new_ohlc_df["close"] = new_ohlc_df["close"].apply(self.to_float)
-                new_ohlc_df["volume"] = new_ohlc_df["volume"].apply(self.to_float)
-                new_ohlc_df["unique_pair_id"] = row[1].values[0]
-                logger.info(f"Updating database for: {row[1].values[0]} {pair_url}")
-                DataHelper().insert_candles_to_db(new_ohlc_df, pair_url)
-                DataHelper().update_check_time(pair_url)
-            else:
-                continue
-
-
-    def get_candle(self, market_symbol, start, limit=1) -> list[dict]:
+        self.checkpoints = None
+
+
+    def update_candles_for_existing_pairs(self):
         """
-         gets single one-minute candle from API
+        streams new candles of all enabled pairs from their cached checkpoints
+        and writes every page to DB as soon as it arrives
         """
-        ohlc_url = OHLC_URL.format(pair_url=market_symbol)
-        params = {"step": 60, "limit": limit, "start": start}
-        resp = requests.get(ohlc_url, params=params, timeout=(3, None))
-        results = resp.json()
-        return results["data"]["ohlc"]
+        if self.checkpoints is None:
+            self.checkpoints = self.data_helper.retrieve_candle_checkpoints()
+        checkpoints = self.checkpoints
+        pair_ids = {pair_url: pair_id for pair_url, (pair_id, _) in checkpoints.items()}
+        starts = {pair_url: start for pair_url, (_, start) in checkpoints.items()}
+
+        def write_page(pair_url: str, ohlc_list: list[dict] | None) -> None:
+            if ohlc_list is None:
+                logger.info(f"Setting pair {pair_url} trading status to DISABLED")
+                self.data_helper.disable_trading_on_db(pair_url)
+                checkpoints.pop(pair_url, None)
+                return
+            with metrics.span("pair_update", pair=pair_url):
+                candles = candles_to_array(ohlc_list)
+                new_ohlc_df = array_to_df(candles, unique_pair_id=pair_ids[pair_url])
+                logger.info(f"Updating database for: {pair_ids[pair_url]} {pair_url}")
+                with self.data_helper.unit_of_work():
+                    self.data_helper.insert_candles_to_db(new_ohlc_df, pair_url)
+                    self.data_helper.update_check_time(pair_url)
+                checkpoints[pair_url] = (pair_ids[pair_url], int(ohlc_list[-1]["timestamp"]) + 60)
+                if self.indicators is not None:
+                    try:
+                        self.indicators.update(pair_url, candles)
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        logger.exception(f"Indicator update failed for {pair_url}")
+            metrics.set_gauge("pair_lag_seconds",
+                              current_unix_time() - checkpoints[pair_url][1], pair=pair_url)
+
+        self.candle_fetcher.stream(starts, current_unix_time(), write_page)
 
 
     def find_starting_timestamp_for_new_pairs(self) -> dict[str, int] | None:
         """
-        Finds the first trading minute of a pair with minimal API calls.
-        Uses large intervals first, then binary search for precision.
+        Finds the first trading minute of pairs without a start timestamp.
+        Known pairs are taken from the local start dates cache,
+        the rest are searched concurrently with page-sized probes.
         Returns a dictionary {market_symbol: first_trade_timestamp}.
         """
-        pairs: list[str] = DataHelper().retrieve_pairs_without_start_timestamp
-        starting_timestamps = {}
-        # pylint: disable=not-an-iterable
-        for market_symbol in pairs:
-            logger.info(f"Searching for starting timestamp of {market_symbol}")
-            low = 1726292210  # 2024-09-14 09:36:50+03 (earliest known complete data)
-            high = cur_unix_time
-            step = FOUR_WEEK_INTERVAL  # Start with large steps
-            # Step 1: Find the first non-empty region using exponential search
-            while low < high:
-                results = self.get_candle(market_symbol, low)
-                if results:
-                    break  # Found a valid region, now narrow down
-                low += step  # Move forward in time
-                step = max(step // 2, ONE_DAY_INTERVAL)  # Reduce step gradually
-            # Step 2: Binary search within the found non-empty region
-            high = low  # Now high is the first known valid timestamp
-            low -= step  # Step back a bit to make sure we include the first trade
-            while low < high:
-                mid = (low + high) // 2
-                results = self.get_candle(market_symbol, mid)
-                if results:
-                    high = mid  # Move left to find earlier candles
-                else:
-                    low = mid + ONE_MINUTE_INTERVAL  # Move right
-            # Final validation: Store the first non-empty timestamp
-            results = self.get_candle(market_symbol, low)
-            readable_timestamp = datetime.fromtimestamp(int(results[0]["timestamp"]))
-            if results:
-                starting_timestamps[market_symbol] = results[0]["timestamp"]
-                unix_timestamp = results[0]["timestamp"]
-                logger.info(f"{market_symbol}: {results[0]["timestamp"]} -> {readable_timestamp}")
-                DataHelper().update_start_timestamp_in_main_table(pair=market_symbol,
-                                                                  timestamp=readable_timestamp,
-                                                                  unix_timestamp=unix_timestamp,
-                                                                  connection=self.psycopg_conn_str)
+        pairs: list[str] = self.data_helper.retrieve_pairs_without_start_timestamp
+        if not pairs:
+            return None
+        starting_timestamps = self.start_discovery.run(pairs, current_unix_time())
+        for market_symbol, unix_timestamp in starting_timestamps.items():
+            readable_timestamp = datetime.fromtimestamp(unix_timestamp)
+            logger.info(f"{market_symbol}: {unix_timestamp} -> {readable_timestamp}")
+            self.data_helper.update_start_timestamp_in_main_table(
+                pair=market_symbol,
+                timestamp=readable_timestamp,
+                unix_timestamp=unix_timestamp)
         return starting_timestamps if starting_timestamps else None
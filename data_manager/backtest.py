@@ -0,0 +1,211 @@
+"""
+vectorized backtests over stored one-minute candles:
+strategies turn a candle array into a position per minute in one pass,
+PnL is evaluated with array operations, and pairs x parameter grids fan out
+over worker processes that map the candles from one shared memory block
+instead of receiving their own copies
+"""
+
+import itertools
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from loguru import logger
+import numpy as np
+import pandas as pd
+from data_manager.data_helper import DataHelper
+from data_manager.indicators import RSI, SMA
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+MINUTES_PER_YEAR = 365 * 24 * 60
+# taker fee of a position change, as a fraction of traded value
+BACKTEST_FEE = float(os.getenv("BACKTEST_FEE", "0.004"))
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+Strategy = Callable[..., np.ndarray]
+
+
+def hold_until_changed(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """
+    long (1) from every entry until the next exit, flat (0) otherwise;
+    the last signal is carried forward without a loop
+    """
+    signal = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    index = np.where(np.isnan(signal), 0, np.arange(len(signal)))
+    np.maximum.accumulate(index, out=index)
+    return np.nan_to_num(signal[index])
+
+
+def sma_crossover(candles: np.ndarray, fast: int = 20, slow: int = 200) -> np.ndarray:
+    """
+    long while the fast SMA of close is above the slow one
+    """
+    if fast >= slow:
+        return np.zeros(len(candles))
+    (fast_sma,), (slow_sma,) = SMA(fast).update(candles), SMA(slow).update(candles)
+    return (fast_sma > slow_sma).astype(np.float64)
+
+
+def rsi_reversion(candles: np.ndarray,
+                  period: int = 14,
+                  lower: float = 30.0,
+                  upper: float = 70.0) -> np.ndarray:
+    """
+    buys when RSI drops below `lower`, sells when it rises above `upper`
+    """
+    (rsi,) = RSI(period).update(candles)
+    return hold_until_changed(rsi < lower, rsi > upper)
+
+
+STRATEGIES: dict[str, Strategy] = {
+    "sma_crossover": sma_crossover,
+    "rsi_reversion": rsi_reversion,
+}
+
+
+def evaluate(candles: np.ndarray, positions: np.ndarray, fee: float = BACKTEST_FEE) -> dict:
+    """
+    performance of holding positions[t] from close t to close t + 1,
+    every change of position pays `fee` on the traded fraction
+    """
+    close = candles["close"]
+    if len(close) < 2:
+        return {"total_return": 0.0, "sharpe": 0.0, "max_drawdown": 0.0,
+                "trades": 0, "exposure": 0.0}
+    held = positions[:-1]
+    turnover = np.abs(np.diff(positions, prepend=0.0))[:-1]
+    returns = held * (close[1:] / close[:-1] - 1.0) - fee * turnover
+    equity = np.cumprod(1.0 + returns)
+    deviation = returns.std()
+    return {
+        "total_return": float(equity[-1] - 1.0),
+        "sharpe": float(returns.mean() / deviation * np.sqrt(MINUTES_PER_YEAR)) if deviation else 0.0,
+        "max_drawdown": float(np.max(1.0 - equity / np.maximum.accumulate(equity))),
+        "trades": int(np.count_nonzero(turnover)),
+        "exposure": float(held.mean()),
+    }
+
+
+def parameter_grid(grid: dict[str, list]) -> list[dict]:
+    """
+    every combination of the listed parameter values
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+# candles of the pairs mapped by a worker process: {pair: view into shared memory}
+_worker_candles: dict[str, np.ndarray] = {}
+_worker_memory: shared_memory.SharedMemory | None = None
+
+
+def _attach(name: str, count: int, offsets: dict[str, tuple[int, int]]) -> None:
+    global _worker_memory  # pylint: disable=global-statement
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    candles = np.ndarray(count, dtype=CANDLE_DTYPE, buffer=_worker_memory.buf)
+    _worker_candles.clear()
+    _worker_candles.update({pair: candles[start:end] for pair, (start, end) in offsets.items()})
+
+
+def _run_task(pair: str, strategy: str, combinations: list[dict], fee: float) -> list[dict]:
+    candles = _worker_candles[pair]
+    return [{"pair": pair, **params, **evaluate(candles, STRATEGIES[strategy](candles, **params), fee)}
+            for params in combinations]
+
+
+class Backtester:
+    """
+    candles of many pairs packed into one shared memory block;
+    use as a context manager or call close() to release it
+    """
+    def __init__(self, candles: dict[str, np.ndarray]) -> None:
+        count = sum(len(pair_candles) for pair_candles in candles.values())
+        self._memory = shared_memory.SharedMemory(create=True,
+                                                  size=max(1, count * CANDLE_DTYPE.itemsize))
+        self.candles = np.ndarray(count, dtype=CANDLE_DTYPE, buffer=self._memory.buf)
+        self.offsets: dict[str, tuple[int, int]] = {}
+        position = 0
+        for pair, pair_candles in candles.items():
+            self.candles[position:position + len(pair_candles)] = pair_candles
+            self.offsets[pair] = (position, position + len(pair_candles))
+            position += len(pair_candles)
+
+
+    @classmethod
+    def from_db(cls,
+                pairs: list[str],
+                start: int,
+                end: int,
+                data_helper: DataHelper | None = None) -> "Backtester":
+        """
+        backtester over the stored candles of `pairs` in [start, end)
+        """
+        data_helper = data_helper or DataHelper()
+        loaded = data_helper.load_candles(pairs, start, end)
+        return cls({pair: candles.astype(CANDLE_DTYPE) for pair, candles in loaded.items()})
+
+
+    def pair_candles(self, pair: str) -> np.ndarray:
+        """
+        view of the candles of a pair
+        """
+        start, end = self.offsets[pair]
+        return self.candles[start:end]
+
+
+    def run(self,
+            strategy: str,
+            grid: dict[str, list],
+            pairs: list[str] | None = None,
+            fee: float = BACKTEST_FEE,
+            workers: int = BACKTEST_WORKERS) -> pd.DataFrame:
+        """
+        evaluates every parameter combination of `grid` on every pair,
+        one row per (pair, parameters) sorted by Sharpe ratio;
+        workers=1 runs in this process
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy}")
+        pairs = list(self.offsets) if pairs is None else pairs
+        combinations = parameter_grid(grid)
+        # a few tasks per worker balance pairs of different length without much overhead
+        chunk_size = max(1, len(pairs) * len(combinations) // (max(workers, 1) * 4))
+        tasks = [(pair, strategy, combinations[start:start + chunk_size], fee)
+                 for pair in pairs for start in range(0, len(combinations), chunk_size)]
+        logger.info(f"Backtesting {strategy}: {len(pairs)} pairs x {len(combinations)} "
+                    f"parameter sets in {len(tasks)} tasks on {workers} workers")
+        if not tasks:
+            return pd.DataFrame()
+        if workers <= 1:
+            _worker_candles.update({pair: self.pair_candles(pair) for pair in pairs})
+            try:
+                results = [_run_task(*task) for task in tasks]
+            finally:
+                # views would keep the shared memory block from being closed
+                _worker_candles.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                     initargs=(self._memory.name, len(self.candles),
+                                               {pair: self.offsets[pair] for pair in pairs})
+                                     ) as executor:
+                results = list(executor.map(_run_task, *zip(*tasks)))
+        rows = [row for task_rows in results for row in task_rows]
+        return pd.DataFrame(rows).sort_values("sharpe", ascending=False, ignore_index=True)
+
+
+    def close(self) -> None:
+        """
+        releases the shared memory block
+        """
+        self.candles = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+    def __enter__(self) -> "Backtester":
+        return self
+
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,130 @@
+"""
+local columnar mirror of the ohlc_<pair> tables:
+one memory-mapped .npy file of CANDLE_DTYPE rows per pair and month,
+with a fixed slot for every minute, so writes are idempotent
+and reads of a range are slices of the mapped file
+"""
+
+import os
+import time
+from pathlib import Path
+from loguru import logger
+import numpy as np
+from dotenv import load_dotenv
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+load_dotenv()
+
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR")
+SLOT_SECONDS = 60
+
+
+def month_start(unix_timestamp: int) -> int:
+    """
+    unix timestamp of the first second of the month (UTC)
+    """
+    month = np.datetime64(int(unix_timestamp), "s").astype("datetime64[M]")
+    return int(month.astype("datetime64[s]").astype(np.int64))
+
+
+def next_month_start(unix_timestamp: int) -> int:
+    """
+    unix timestamp of the first second of the following month (UTC)
+    """
+    month = np.datetime64(int(unix_timestamp), "s").astype("datetime64[M]") + np.timedelta64(1, "M")
+    return int(month.astype("datetime64[s]").astype(np.int64))
+
+
+class CandleCache:
+    """
+    <root>/<pair>/<YYYY-MM>.npy files; empty slots have timestamp 0
+    """
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+
+    def month_path(self, pair: str, start: int) -> Path:
+        """
+        file holding the month that contains `start`
+        """
+        month = np.datetime64(int(start), "s").astype("datetime64[M]")
+        return self.root / pair / f"{month}.npy"
+
+
+    def month_view(self, pair: str, start: int, writable: bool = False) -> np.memmap | None:
+        """
+        memory map of the month that contains `start` (every minute slot,
+        including empty ones), created if `writable`; None if not cached
+        """
+        path = self.month_path(pair, start)
+        if path.exists():
+            return np.load(path, mmap_mode="r+" if writable else "r")
+        if not writable:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        slots = (next_month_start(start) - month_start(start)) // SLOT_SECONDS
+        view = np.lib.format.open_memmap(path, mode="w+", dtype=CANDLE_DTYPE, shape=(slots,))
+        view["timestamp"] = 0
+        return view
+
+
+    def write(self, pair: str, candles: np.ndarray) -> None:
+        """
+        stores CANDLE_DTYPE rows in their minute slots, overwriting previous values
+        """
+        if not len(candles):
+            return
+        months = candles["timestamp"].astype("datetime64[s]").astype("datetime64[M]")
+        for month in np.unique(months):
+            month_candles = candles[months == month]
+            first = int(month.astype("datetime64[s]").astype(np.int64))
+            view = self.month_view(pair, first, writable=True)
+            view[(month_candles["timestamp"] - first) // SLOT_SECONDS] = month_candles
+            view.flush()
+
+
+    def read(self, pair: str, start: int, end: int) -> np.ndarray:
+        """
+        cached candles of a pair in [start, end): a zero-copy slice of the
+        memory map when the range lies in one month without missing minutes,
+        otherwise a compacted copy of the cached rows
+        """
+        parts: list[np.ndarray] = []
+        month = month_start(start)
+        while month < end:
+            view = self.month_view(pair, month)
+            month_end = next_month_start(month)
+            if view is not None:
+                low = max(start - month, 0) // SLOT_SECONDS
+                high = -(-(min(end, month_end) - month) // SLOT_SECONDS)
+                parts.append(view[low:high])
+            month = month_end
+        if len(parts) == 1 and parts[0]["timestamp"].all():
+            return parts[0]
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        rows = np.concatenate(parts)
+        return rows[rows["timestamp"] != 0]
+
+
+    def fill_from_db(self,
+                     data_helper,
+                     pair: str,
+                     start: int = 0,
+                     end: int | None = None) -> int:
+        """
+        mirrors candles of a pair already stored on DB into the cache,
+        returns the number of cached rows
+        """
+        end = int(time.time()) if end is None else end
+        candles = data_helper.load_candles([pair], start, end)[pair]
+        self.write(pair, candles)
+        logger.info(f"{len(candles)} candles of {pair} mirrored to {self.root}")
+        return len(candles)
+
+
+def get_candle_cache() -> CandleCache | None:
+    """
+    cache configured with CANDLE_CACHE_DIR, None when caching is disabled
+    """
+    return CandleCache(CANDLE_CACHE_DIR) if CANDLE_CACHE_DIR else None
@@ -0,0 +1,330 @@
+"""
+asyncio based ohlc fetch engine.
+pages of many pairs are requested concurrently while a shared
+token bucket keeps the overall request rate within Bitstamp's budget
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from contextlib import aclosing, asynccontextmanager
+from loguru import logger
+import aiohttp
+from dotenv import load_dotenv
+from data_manager.api_client import (
+    MAX_RETRIES,
+    OHLC_URL,
+    RETRY_STATUSES,
+    LatencyStats,
+    backoff_delay,
+    get_client,
+)
+from data_manager.metrics import get_metrics
+
+load_dotenv()
+
+metrics = get_metrics()
+
+PAGE_LIMIT = 1000
+CANDLE_STEP = 60
+PAGE_INTERVAL = PAGE_LIMIT * CANDLE_STEP
+# Bitstamp allows 10 000 requests per 10 minutes (~16.6 req/s sustained),
+# the defaults stay slightly below that budget
+REQUEST_RATE = float(os.getenv("BITSTAMP_REQUEST_RATE", "15"))
+REQUEST_BURST = int(os.getenv("BITSTAMP_REQUEST_BURST", "30"))
+FETCH_CONCURRENCY = int(os.getenv("BITSTAMP_FETCH_CONCURRENCY", "32"))
+# pages fetched but not yet written, across all pairs
+STREAM_BUFFER_PAGES = int(os.getenv("BITSTAMP_STREAM_BUFFER_PAGES", "64"))
+PAIR_PREFETCH_PAGES = 4
+# seconds, like the sync client: connecting, waiting between response bytes
+# and the whole request, so a stalled response cannot hang a stream
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = float(os.getenv("BITSTAMP_READ_TIMEOUT", "30"))
+REQUEST_TIMEOUT = float(os.getenv("BITSTAMP_REQUEST_TIMEOUT", "60"))
+# transient failures retried like 429 / 5xx responses
+RETRY_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, TimeoutError)
+# stream queue marker: every page of the pair has been queued
+_PAIR_DONE = object()
+
+
+class PairNotFoundError(Exception):
+    """
+    raised when API responds with 404 for a pair,
+    meaning the pair is no longer traded
+    """
+
+
+class TokenBucket:
+    """
+    token bucket rate limiter shared by all fetch tasks:
+    refills `rate` tokens per second up to `capacity`
+    """
+    def __init__(self, rate: float = REQUEST_RATE, capacity: int = REQUEST_BURST) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+
+    async def acquire(self) -> None:
+        """
+        takes a single request token, waiting for the refill if the bucket
+        is empty; tokens are reserved before sleeping, so concurrent
+        callers queue up without a lock and the bucket can be shared
+        between event loops
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class AsyncCandleFetcher:
+    """
+    fetches one-minute candles for many pairs at once,
+    every page is an independent request limited by
+    a semaphore (concurrency) and a token bucket (rate)
+    """
+    def __init__(self,
+                 ohlc_url: str = OHLC_URL,
+                 concurrency: int = FETCH_CONCURRENCY,
+                 rate_limiter: TokenBucket | None = None,
+                 latency: LatencyStats | None = None) -> None:
+        self.ohlc_url = ohlc_url
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or TokenBucket()
+        self.latency = latency or get_client().latency
+        self.requests_sent = 0
+        self._runner: asyncio.Runner | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """
+        client session with a connection pool sized to the concurrency limit,
+        kept open between runs so connections stay warm
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT,
+                                            sock_connect=CONNECT_TIMEOUT,
+                                            sock_read=READ_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        yield self._session
+
+
+    def run_until_complete[T](self, awaitable: Awaitable[T]) -> T:
+        """
+        runs `awaitable` on the fetcher's own event loop, which lives
+        until close(), so the session can be reused by later calls
+        """
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+
+        async def wait() -> T:
+            return await awaitable
+
+        return self._runner.run(wait())
+
+
+    def close(self) -> None:
+        """
+        closes the session and the event loop
+        """
+        if self._runner is None:
+            return
+        if self._session is not None and not self._session.closed:
+            self._runner.run(self._session.close())
+        self._runner.close()
+        self._runner = None
+        self._session = None
+
+
+    async def fetch_page(self,
+                         session: aiohttp.ClientSession,
+                         semaphore: asyncio.Semaphore,
+                         pair: str,
+                         start: int) -> list[dict]:
+        """
+        gets a single page of up to PAGE_LIMIT candles starting at `start`,
+        retries with jittered exponential backoff on 429 / 5xx responses,
+        connection errors and timeouts
+        """
+        params = {
+            "step": CANDLE_STEP,
+            "limit": PAGE_LIMIT,
+            "start": start,
+            "exclude_current_candle": "true",
+        }
+        attempt = 0
+        while True:
+            retry_after = None
+            async with semaphore:
+                await self.rate_limiter.acquire()
+                self.requests_sent += 1
+                started = time.perf_counter()
+                try:
+                    async with session.get(self.ohlc_url.format(pair_url=pair),
+                                           params=params) as resp:
+                        elapsed = time.perf_counter() - started
+                        self.latency.record("ohlc", elapsed)
+                        metrics.observe("api_request", elapsed, endpoint="ohlc")
+                        metrics.inc("api_calls_total", endpoint="ohlc", status=resp.status)
+                        if resp.status == 404:
+                            raise PairNotFoundError(pair)
+                        if resp.status not in RETRY_STATUSES or attempt >= MAX_RETRIES:
+                            resp.raise_for_status()
+                            payload = await resp.json()
+                            return payload["data"]["ohlc"]
+                        reason = f"status {resp.status}"
+                        retry_after = resp.headers.get("Retry-After")
+                except RETRY_ERRORS as error:
+                    metrics.inc("api_calls_total", endpoint="ohlc", status="error")
+                    if attempt >= MAX_RETRIES:
+                        raise
+                    reason = repr(error)
+            delay = backoff_delay(attempt, retry_after)
+            logger.warning(f"{pair} page {start}: {reason}, retrying in {delay:.2f}s")
+            metrics.inc("api_retries_total", endpoint="ohlc")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+    async def iter_pages(self,
+                         session: aiohttp.ClientSession,
+                         semaphore: asyncio.Semaphore,
+                         buffer: asyncio.Semaphore,
+                         pair: str,
+                         page_starts: Iterable[int],
+                         prefetch: int = PAIR_PREFETCH_PAGES) -> AsyncIterator[list[dict]]:
+        """
+        yields the pages of a pair in order, with up to `prefetch` requests in flight;
+        the consumer releases the `buffer` slot of every page, and only
+        a pair without pending pages waits for a slot, so pairs cannot deadlock
+        """
+        page_starts = iter(page_starts)
+        pending: deque[asyncio.Task] = deque()
+        exhausted = False
+
+        async def fill() -> None:
+            nonlocal exhausted
+            while not exhausted and len(pending) < prefetch:
+                if pending and buffer.locked():
+                    return
+                page_start = next(page_starts, None)
+                if page_start is None:
+                    exhausted = True
+                    return
+                await buffer.acquire()
+                pending.append(asyncio.create_task(
+                    self.fetch_page(session, semaphore, pair, page_start)))
+
+        try:
+            await fill()
+            while pending:
+                task = pending.popleft()
+                try:
+                    page = await task
+                except BaseException:
+                    buffer.release()
+                    raise
+                yield page
+                await fill()
+        finally:
+            for task in pending:
+                task.cancel()
+                buffer.release()
+
+
+    async def stream_pairs(self,
+                           starts: dict[str, int],
+                           end: int,
+                           sink: Callable[[str, list[dict] | None], None],
+                           buffer_pages: int = STREAM_BUFFER_PAGES) -> None:
+        """
+        streams all pages of the pairs in `starts` ({pair_url: start}) up to `end`,
+        see stream_pages
+        """
+        await self.stream_pages({pair: range(start, end - CANDLE_STEP, PAGE_INTERVAL)
+                                 for pair, start in starts.items()},
+                                sink, buffer_pages=buffer_pages)
+
+
+    async def stream_pages(self,
+                           pages: dict[str, Iterable[int]],
+                           sink: Callable[[str, list[dict] | None], None],
+                           done: Callable[[str], None] | None = None,
+                           buffer_pages: int = STREAM_BUFFER_PAGES) -> None:
+        """
+        passes the pages of every pair ({pair_url: page starts}) in order to
+        `sink(pair, page)` in a thread, at most `buffer_pages` pages wait in memory;
+        unknown pairs get None, `done(pair)` follows the last page of a pair that did not fail
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        buffer = asyncio.Semaphore(buffer_pages)
+        queue: asyncio.Queue[tuple[str, object] | None] = asyncio.Queue()
+        failed: set[str] = set()
+
+        async def produce(session: aiohttp.ClientSession,
+                          pair: str,
+                          page_starts: Iterable[int]) -> None:
+            try:
+                async with aclosing(self.iter_pages(session, semaphore, buffer,
+                                                    pair, page_starts)) as pair_pages:
+                    async for page in pair_pages:
+                        if pair in failed:
+                            buffer.release()
+                            return
+                        await queue.put((pair, page))
+                await queue.put((pair, _PAIR_DONE))
+            except PairNotFoundError:
+                logger.error(f"Bad status code for {pair}")
+                await queue.put((pair, None))
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                logger.error(f"Failed to fetch candles for {pair}: {error!r}")
+
+        async def consume() -> None:
+            while (item := await queue.get()) is not None:
+                pair, page = item
+                try:
+                    if pair in failed:
+                        continue
+                    if page is _PAIR_DONE:
+                        if done is not None:
+                            await asyncio.to_thread(done, pair)
+                    elif page != []:
+                        await asyncio.to_thread(sink, pair, page)
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    logger.error(f"Failed to write candles for {pair}: {error!r}")
+                    failed.add(pair)
+                finally:
+                    if isinstance(page, list):
+                        buffer.release()
+
+        async with self.session() as session:
+            consumer = asyncio.create_task(consume())
+            async with asyncio.TaskGroup() as group:
+                for pair, page_starts in pages.items():
+                    group.create_task(produce(session, pair, page_starts))
+            await queue.put(None)
+            await consumer
+
+
+    def stream(self,
+               starts: dict[str, int],
+               end: int,
+               sink: Callable[[str, list[dict] | None], None]) -> None:
+        """
+        synchronous entry point for stream_pairs
+        """
+        started = time.perf_counter()
+        requests_before = self.requests_sent
+        self.run_until_complete(self.stream_pairs(starts, end, sink))
+        elapsed = time.perf_counter() - started
+        logger.info(f"Streamed {len(starts)} pairs with "
+                    f"{self.requests_sent - requests_before} requests in {elapsed:.2f}s")
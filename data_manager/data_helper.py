@@ -1,30 +1,100 @@
 """
 auxiliary functions to manipulate DB data
-are contained in this module
+are contained in this module.
+pandas, NumPy and the modules built on them are imported by the methods
+that need them, so status-only runs start without them
 """
+import atexit
 import os
 import datetime
+import functools
+import itertools
+import threading
 import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
 from loguru import logger
 from dotenv import load_dotenv
 import psycopg
 from psycopg import sql
+from psycopg_pool import ConnectionPool
 import pytz
-import pandas as pd
-import numpy as np
+from data_manager.metrics import get_metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from data_manager.candle_cache import CandleCache
 
 load_dotenv()
 
+metrics = get_metrics()
+
 API_PAIRS_URL = "https://www.bitstamp.net/api/v2/trading-pairs-info/"
+COPY_BATCH_SIZE = int(os.getenv("COPY_BATCH_SIZE", "100000"))
+# binary COPY needs exact wire types, staging rows are sent as
+# int4 / int8 epoch / float8 and cast to the pair table types by the server
+STAGING_TYPES = ("int4", "int8", "float8", "float8", "float8", "float8", "float8")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "8"))
+# new pair tables: "numeric" (original NUMERIC columns with unique_pair_id)
+# or "compact" (float8 prices, no per-row pair id)
+COMPACT_SCHEMA = os.getenv("OHLC_SCHEMA", "numeric") == "compact"
+# chunks older than this are compressed, 0 disables compression of new tables
+COMPRESS_AFTER_DAYS = int(os.getenv("COMPRESS_AFTER_DAYS", "7"))
+# candle storage backend: "per_pair" (ohlc_<pair> hypertable for every pair)
+# or "consolidated" (single ohlc hypertable keyed by unique_pair_id, timestamp)
+PER_PAIR_STORAGE = "per_pair"
+CONSOLIDATED_STORAGE = "consolidated"
+OHLC_STORAGE = os.getenv("OHLC_STORAGE", PER_PAIR_STORAGE)
+CONSOLIDATED_TABLE = "ohlc"
+# hash partitions of the consolidated hypertable's unique_pair_id dimension
+OHLC_SPACE_PARTITIONS = int(os.getenv("OHLC_SPACE_PARTITIONS", "4"))
+
+_pool: ConnectionPool | None = None
+
+
+def count_connection(conn: psycopg.Connection) -> None:  # pylint: disable=unused-argument
+    """
+    pool hook called for every new DB connection
+    """
+    metrics.inc("db_connections_opened_total")
+
+
+def get_pool(conninfo: str) -> ConnectionPool:
+    """
+    process-wide connection pool shared by all DataHelper instances,
+    opened on first use and closed at interpreter exit
+    """
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        _pool = ConnectionPool(conninfo,
+                               min_size=DB_POOL_MIN_SIZE,
+                               max_size=DB_POOL_MAX_SIZE,
+                               name="data_helper",
+                               configure=count_connection,
+                               open=True)
+        atexit.register(_pool.close)
+    return _pool
+
+
+def candle_relation(table_name: str, timeframe: str = "1m") -> str:
+    """
+    name of the candle table (1m) or of its continuous aggregate holding `timeframe` candles
+    """
+    return table_name if timeframe == "1m" else f"{table_name}_{timeframe}"
+
 
 class DataHelper:
     """
     Methods that contain specific SQL queries
     """
-    def __init__(self) -> None:
-        self.cur_time = datetime.datetime.now(pytz.timezone(
-        "Europe/Vilnius")).replace(microsecond=0)
-        self.cur_unix_time = int(time.mktime(self.cur_time.timetuple()))
+    def __init__(self, storage: str = OHLC_STORAGE) -> None:
+        if storage not in (PER_PAIR_STORAGE, CONSOLIDATED_STORAGE):
+            raise ValueError(f"Unknown candle storage: {storage}")
+        self.storage = storage
         self.sql_dict = {
             "username": os.getenv("PSQL_USER"),
             "password": os.getenv("PSQL_PASSWORD"),
@@ -37,30 +107,145 @@ class DataHelper:
                             password={self.sql_dict['password']}
                             host={self.sql_dict['host']}
                             port={self.sql_dict['port']}"""
-        self.sqlalchemy_conn_str = f"""postgresql+psycopg://{self.sql_dict['username']}:
-                          {self.sql_dict['password']}@{self.sql_dict['host']}:
-                          {self.sql_dict['port']}/{self.sql_dict['database']}"""
+        # per thread, so calls from other threads never join an open unit of work
+        self._local = threading.local()
+        self._pair_id_columns: dict[str, bool] = {}
+        self._pair_ids: dict[str, int] = {}
+        self._timescale: bool | None = None
+
+
+    @functools.cached_property
+    def candle_cache(self) -> "CandleCache | None":
+        """
+        local candle cache configured with CANDLE_CACHE_DIR, None when disabled
+        """
+        # pylint: disable=import-outside-toplevel
+        from data_manager.candle_cache import get_candle_cache
+        return get_candle_cache()
+
+
+    @property
+    def cur_time(self) -> datetime.datetime:
+        """
+        current time, evaluated on every access so a long-lived helper stays accurate
+        """
+        return datetime.datetime.now(pytz.timezone("Europe/Vilnius")).replace(microsecond=0)
+
+
+    @property
+    def cur_unix_time(self) -> int:
+        """
+        current unix time
+        """
+        return int(self.cur_time.timestamp())
+
+
+    @property
+    def _uow_conn(self) -> psycopg.Connection | None:
+        """
+        connection of the unit of work open in the calling thread
+        """
+        return getattr(self._local, "conn", None)
+
+
+    @_uow_conn.setter
+    def _uow_conn(self, conn: psycopg.Connection | None) -> None:
+        self._local.conn = conn
+
+
+    @contextmanager
+    def connection(self) -> Iterator[psycopg.Connection]:
+        """
+        yields the unit of work connection if one is open,
+        otherwise borrows a connection from the shared pool
+        which is committed (or rolled back on error) when returned
+        """
+        if self._uow_conn is not None:
+            yield self._uow_conn
+            return
+        with get_pool(self.psycopg_conn_str).connection() as conn:
+            yield conn
+
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["DataHelper"]:
+        """
+        every DataHelper call made inside the block by the same thread runs on
+        one pooled connection in a single transaction, which is committed
+        on success and rolled back on error; nested blocks join the outer one
+        """
+        if self._uow_conn is not None:
+            yield self
+            return
+        with get_pool(self.psycopg_conn_str).connection() as conn:
+            self._uow_conn = conn
+            try:
+                with conn.transaction():
+                    yield self
+            finally:
+                self._uow_conn = None
+
+
+    def _commit(self, conn: psycopg.Connection) -> None:
+        """
+        commits unless the connection belongs to an open unit of work
+        """
+        if conn is not self._uow_conn:
+            conn.commit()
+
+
+    def pair_id(self, pair: str) -> int:
+        """
+        unique_pair_id of a pair, cached as ids never change
+        """
+        if pair not in self._pair_ids:
+            with self.connection() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT pair_url, unique_pair_id FROM bitstamp_pairs;")
+                self._pair_ids.update(cur.fetchall())
+                cur.close()
+            if pair not in self._pair_ids:
+                raise ValueError(f"Unknown pair {pair}")
+        return self._pair_ids[pair]
 
 
-    def retrieve_df_with_last_candle(self, pair: str) -> pd.DataFrame:
+    def candle_source(self,
+                      pair: str,
+                      timeframe: str = "1m") -> tuple[sql.Composable, sql.Composable]:
+        """
+        (relation, row filter) with `timeframe` candles of a pair: its own
+        ohlc_<pair> table / aggregate, or the consolidated ohlc table / aggregate
+        filtered by unique_pair_id
+        """
+        if self.storage == CONSOLIDATED_STORAGE:
+            return (sql.Identifier(candle_relation(CONSOLIDATED_TABLE, timeframe)),
+                    sql.SQL("unique_pair_id = {}").format(sql.Literal(self.pair_id(pair))))
+        return sql.Identifier(candle_relation(f"ohlc_{pair}", timeframe)), sql.SQL("TRUE")
+
+
+    @metrics.timed("db_call")
+    def retrieve_df_with_last_candle(self, pair: str) -> "pd.DataFrame":
         """
         auxialiary function to prepare a template dataframe
         which contains single row with the last existing ohlc data
         from DB for a specific pair
         """
+        # pylint: disable=import-outside-toplevel
+        import numpy as np
+        import pandas as pd
         last_candle_query = sql.SQL("""--sql
         SELECT timestamp, open, high, low, close, volume
         FROM {}
+        WHERE {}
         ORDER BY timestamp DESC
         LIMIT 1;
-        """).format(sql.Identifier(f"ohlc_{pair}"))
+        """).format(*self.candle_source(pair))
         start_timestamp_query = sql.SQL("""--sql
         SELECT unix_timestamp
         FROM bitstamp_pairs
         WHERE pair_url = {}
         """).format(sql.Literal(pair))
-        # pylint: disable=not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(last_candle_query)
             results = cur.fetchone()
@@ -73,11 +258,7 @@ class DataHelper:
                                                  4: "close",
                                                  5: "volume"},
                                         inplace=True)
-                single_candle_df["unix_timestamp"] = pd.to_datetime(
-                    single_candle_df["unix_timestamp"]).dt.tz_convert("UTC").dt.floor("s")
-                single_candle_df["unix_timestamp"] = single_candle_df[
-                    "unix_timestamp"].astype("int64") // 10**9
-                single_candle_df["unix_timestamp"] += 60
+                single_candle_df["unix_timestamp"] = int(results[0].timestamp()) + 60
                 return single_candle_df
             if results is None:
                 cur.execute(start_timestamp_query)
@@ -90,27 +271,266 @@ class DataHelper:
                                                  "volume": np.nan},
                                                 index=[0])
                 return single_candle_df
-            conn.commit()
-            cur.close()
         raise ValueError(f"No data found for pair {pair}")
 
+
+    @metrics.timed("db_call")
+    def retrieve_candle_checkpoints(self,
+                                    pairs: list[str] | None = None) -> dict[str, tuple[int, int]]:
+        """
+        {pair_url: (unique_pair_id, first missing candle unix)} of given or all traded pairs
+        from last_candle_unix in one query, falling back to the last stored candle
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        checkpoints_query = sql.SQL("""--sql
+        SELECT unique_pair_id,
+               pair_url,
+               last_candle_unix + 60
+        FROM bitstamp_pairs
+        WHERE {};
+        """).format(sql.SQL("trading_enabled = TRUE") if pairs is None
+                    else sql.SQL("pair_url = ANY({})").format(sql.Literal(list(pairs))))
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(checkpoints_query)
+            results = cur.fetchall()
+            cur.close()
+        checkpoints: dict[str, tuple[int, int]] = {}
+        for unique_pair_id, pair_url, next_candle in results:
+            if next_candle is None:
+                next_candle = self.retrieve_df_with_last_candle(pair_url)["unix_timestamp"].values[0]
+            if pd.isna(next_candle):
+                continue
+            checkpoints[pair_url] = (unique_pair_id, int(next_candle))
+        return checkpoints
+
+
+    def load_candles(self,
+                     pairs: Iterable[str],
+                     start: int,
+                     end: int,
+                     columns: Iterable[str] | None = None,
+                     timeframe: str = "1m") -> dict[str, "np.ndarray"]:
+        """
+        {pair_url: structured array} of time ordered candles in [start, end),
+        pairs loaded concurrently on pooled connections; higher timeframes
+        come from the continuous aggregates
+        """
+        # pylint: disable=import-outside-toplevel
+        from data_manager.ohlc_normalizer import PRICE_COLUMNS
+        from data_manager.resampler import TIMEFRAMES
+        columns = PRICE_COLUMNS if columns is None else tuple(columns)
+        pairs = list(pairs)
+        if timeframe not in TIMEFRAMES:
+            raise ValueError(f"Unknown timeframe: {timeframe}")
+
+        def load(pair: str) -> "np.ndarray":
+            return self._load_pair_candles(pair, start, end, columns, timeframe)
+
+        if self._uow_conn is not None or len(pairs) == 1:
+            return {pair: load(pair) for pair in pairs}
+        with ThreadPoolExecutor(max_workers=min(len(pairs), DB_POOL_MAX_SIZE) or 1) as executor:
+            return dict(zip(pairs, executor.map(load, pairs)))
+
+
+    @metrics.timed("db_call")
+    def _load_pair_candles(self,
+                           pair: str,
+                           start: int,
+                           end: int,
+                           columns: tuple[str, ...],
+                           timeframe: str = "1m") -> "np.ndarray":
+        """
+        reads candles of a single pair as one bytea of packed big-endian rows
+        per day (NULL prices as NaN), parsed with a single NumPy view
+        """
+        # pylint: disable=import-outside-toplevel
+        import numpy as np
+        from data_manager.ohlc_normalizer import CANDLE_DTYPE, PRICE_COLUMNS
+        unknown = set(columns) - set(PRICE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown candle columns: {', '.join(sorted(unknown))}")
+        packed_row = sql.SQL(" || ").join([
+            sql.SQL("""int8send(date_part('epoch', "timestamp")::BIGINT)"""),
+            *(sql.SQL("float8send(COALESCE({}::DOUBLE PRECISION, 'NaN'))").format(
+                sql.Identifier(column)) for column in columns),
+        ])
+        load_query = sql.SQL("""--sql
+        SELECT string_agg({}, ''::BYTEA ORDER BY "timestamp")
+        FROM {}
+        WHERE {}
+          AND "timestamp" >= to_timestamp(%(start)s)
+          AND "timestamp" < to_timestamp(%(end)s)
+        GROUP BY date_trunc('day', "timestamp")
+        ORDER BY date_trunc('day', "timestamp");
+        """).format(packed_row, *self.candle_source(pair, timeframe))
+        fields = ("timestamp", *columns)
+        with self.connection() as conn, conn.cursor(binary=True) as cur:
+            cur.execute(load_query, {"start": int(start), "end": int(end)})
+            days = cur.fetchall()
+            self._commit(conn)
+        rows = np.frombuffer(b"".join(day for day, in days),
+                             dtype=[("timestamp", ">i8"), *((column, ">f8") for column in columns)])
+        candles = np.empty(len(rows), dtype=[(field, CANDLE_DTYPE[field]) for field in fields])
+        for field in fields:
+            candles[field] = rows[field]
+        return candles
+
+
+    @metrics.timed("db_call")
+    def retrieve_gap_scan_targets(self,
+                                  pairs: list[str] | None = None) -> list[tuple[int, str, int, int]]:
+        """
+        (unique_pair_id, pair_url, scan start, scan end) of given pairs or of all
+        traded pairs; the scan starts at the gap scan watermark (or the pair start)
+        and ends after the last stored candle
+        """
+        targets_query = sql.SQL("""--sql
+        SELECT unique_pair_id,
+               pair_url,
+               COALESCE(gap_scan_unix, unix_timestamp),
+               last_candle_unix + 60
+        FROM bitstamp_pairs
+        WHERE {}
+          AND last_candle_unix IS NOT NULL
+          AND COALESCE(gap_scan_unix, unix_timestamp) IS NOT NULL
+        ORDER BY unique_pair_id;
+        """).format(sql.SQL("trading_enabled = TRUE") if pairs is None
+                    else sql.SQL("pair_url = ANY({})").format(sql.Literal(list(pairs))))
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(targets_query)
+            results = cur.fetchall()
+            cur.close()
+        return [(unique_pair_id, pair_url, int(start), int(end))
+                for unique_pair_id, pair_url, start, end in results if start < end]
+
+
+    @metrics.timed("db_call")
+    def retrieve_chunk_row_counts(self,
+                                  pair: str,
+                                  start: int,
+                                  end: int) -> list[tuple[int, int, int]] | None:
+        """
+        (range start, range end, approximate row count) of the pair hypertable
+        chunks overlapping [start, end), ordered by time; counts come from
+        table statistics, so no chunk is scanned. None without TimescaleDB
+        and for consolidated storage, whose chunks hold many pairs
+        """
+        chunks_query = """--sql
+        SELECT extract(epoch FROM range_start)::BIGINT,
+               extract(epoch FROM range_end)::BIGINT,
+               approximate_row_count(format('%%I.%%I', chunk_schema, chunk_name)::REGCLASS)
+        FROM timescaledb_information.chunks
+        WHERE hypertable_name = %(table)s
+          AND range_end > to_timestamp(%(start)s)
+          AND range_start < to_timestamp(%(end)s)
+        ORDER BY range_start;
+        """
+        if self.storage == CONSOLIDATED_STORAGE:
+            return None
+        with self.connection() as conn:
+            if not self.has_timescale(conn):
+                return None
+            cur = conn.cursor()
+            cur.execute(chunks_query, {"table": f"ohlc_{pair}", "start": start, "end": end})
+            results = cur.fetchall()
+            cur.close()
+        return results
+
+
+    @metrics.timed("db_call")
+    def update_gap_watermark(self, pair: str, unix_timestamp: int) -> None:
+        """
+        marks candles of a pair before `unix_timestamp` as scanned for gaps
+        """
+        update_watermark_query = """--sql
+        UPDATE bitstamp_pairs
+        SET gap_scan_unix = %(unix_timestamp)s
+        WHERE pair_url = %(pair)s;
+        """
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(update_watermark_query, {"unix_timestamp": unix_timestamp, "pair": pair})
+            self._commit(conn)
+
+
+    @metrics.timed("db_call")
+    def load_cross_section(self,
+                           timestamp: int,
+                           pairs: Iterable[str] | None = None,
+                           timeframe: str = "1m") -> "np.ndarray":
+        """
+        candles of all traded pairs (or of `pairs`) at a single minute / bucket
+        as an array of unique_pair_id and CANDLE_DTYPE fields, ordered by pair;
+        a single indexed query on consolidated storage, a UNION ALL of the pair
+        tables otherwise
+        """
+        # pylint: disable=import-outside-toplevel
+        import numpy as np
+        from data_manager.ohlc_normalizer import CANDLE_DTYPE
+        pairs = (list(pairs) if pairs is not None
+                 else self.retrieve_traded_pairs_from_db["pair_url"].tolist())
+        candle_query = """--sql
+        SELECT {pair_id}, date_part('epoch', "timestamp")::BIGINT,
+               "open"::DOUBLE PRECISION, high::DOUBLE PRECISION, low::DOUBLE PRECISION,
+               "close"::DOUBLE PRECISION, volume::DOUBLE PRECISION
+        FROM {relation}
+        WHERE {pair_filter} AND "timestamp" = to_timestamp(%(timestamp)s)
+        """
+        if self.storage == CONSOLIDATED_STORAGE:
+            cross_section_query = sql.SQL(candle_query).format(
+                pair_id=sql.SQL("unique_pair_id"),
+                relation=sql.Identifier(candle_relation(CONSOLIDATED_TABLE, timeframe)),
+                pair_filter=sql.SQL("unique_pair_id = ANY({})").format(
+                    sql.Literal([self.pair_id(pair) for pair in pairs])),
+            )
+        else:
+            cross_section_query = sql.SQL(" UNION ALL ").join(
+                sql.SQL(candle_query).format(pair_id=sql.Literal(self.pair_id(pair)),
+                                             relation=relation,
+                                             pair_filter=pair_filter)
+                for pair in pairs
+                for relation, pair_filter in [self.candle_source(pair, timeframe)])
+        dtype = np.dtype([("unique_pair_id", np.int32), *CANDLE_DTYPE.descr])
+        if not pairs:
+            return np.empty(0, dtype=dtype)
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(sql.SQL("{} ORDER BY 1;").format(cross_section_query),
+                        {"timestamp": int(timestamp)})
+            results = cur.fetchall()
+            cur.close()
+        return np.array(results, dtype=dtype)
+
+
     @property
-    def retrieve_trading_status_from_db(self) -> pd.DataFrame:
+    @metrics.timed("db_call")
+    def retrieve_trading_status_rows(self) -> list[tuple[str, bool, datetime.datetime]]:
         """
-        gets pair urls, trading status and last checked datetime from database and
-        returns it as pandas dataframe
+        gets (pair url, trading status, last checked datetime) rows from database
         """
         get_pairs_info_query = """--sql
         SELECT pair_url, trading_enabled, last_checked_for_trading
         FROM bitstamp_pairs;
         """
-        # pylint:disable=not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             _ = cur.execute(get_pairs_info_query)
             results = cur.fetchall()
             cur.close()
-        db_df = pd.DataFrame(results)
+        return results
+
+
+    @property
+    def retrieve_trading_status_from_db(self) -> "pd.DataFrame":
+        """
+        gets pair urls, trading status and last checked datetime from database and
+        returns it as pandas dataframe
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+        db_df = pd.DataFrame(self.retrieve_trading_status_rows,
+                             columns=[0, 1, 2])
         db_df.rename(columns={0: 'pair_url',
                               1: 'trading_enabled',
                               2: 'last_checked_for_trading'},
@@ -119,18 +539,19 @@ class DataHelper:
 
 
     @property
-    def retrieve_traded_pairs_from_db(self) -> pd.DataFrame:
+    @metrics.timed("db_call")
+    def retrieve_traded_pairs_from_db(self) -> "pd.DataFrame":
         """
         gets existing pairs from DB with trading_status = Enabled
         """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
         retrieve_pairs_query = """--sql
         SELECT unique_pair_id,
                pair_url
         FROM bitstamp_pairs
         WHERE trading_enabled = TRUE;
         """
-        # pylint:disable = not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(retrieve_pairs_query)
             results = cur.fetchall()
@@ -144,57 +565,141 @@ class DataHelper:
         """
         only check time for specific pair gets updated
         """
-        update_check_time_query = """--sql
+        self.update_check_times([pair])
+
+
+    @metrics.timed("db_call")
+    def update_check_times(self, pairs: list[str]) -> None:
+        """
+        check time for all given pairs gets updated with a single statement
+        """
+        update_check_times_query = """--sql
         UPDATE bitstamp_pairs
         SET last_checked_for_trading = %(cur_time)s
-        WHERE pair_url = %(pair)s;
+        WHERE pair_url = ANY(%(pairs)s);
         """
-        # pylint:disable = not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(
-                update_check_time_query,
-                {"cur_time": self.cur_time, "pair": pair},
+                update_check_times_query,
+                {"cur_time": self.cur_time, "pairs": list(pairs)},
             )
-            conn.commit()
+            self._commit(conn)
 
 
     def disable_trading_on_db(self, pair: str) -> None:
         """
         sets trading status to 'DISABLED' in DB if API doesn't return any ohlc data
         """
-        update_trading_status_query = """--sql
-            update bitstamp_pairs
-            set trading_enabled = FALSE,
-            where pair_url = %(pair)s;
+        self.disable_pairs([pair])
+
+
+    @metrics.timed("db_call")
+    def disable_pairs(self, pairs: list[str]) -> None:
+        """
+        sets trading status to 'DISABLED' and updates check time
+        for all given pairs with a single statement
+        """
+        disable_pairs_query = """--sql
+            UPDATE bitstamp_pairs
+            SET trading_enabled = FALSE,
+                last_checked_for_trading = %(cur_time)s
+            WHERE pair_url = ANY(%(pairs)s);
             """
-        # pylint:disable = not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(
-                update_trading_status_query,
-                {"pair": pair},
+                disable_pairs_query,
+                {"cur_time": self.cur_time, "pairs": list(pairs)},
             )
-            conn.commit()
-            cur.close()
-        self.update_check_time(pair)
-        logger.info(f"Trading status has been set to 'DISABLED' for: {pair}")
+            self._commit(conn)
+        logger.info(f"Trading status has been set to 'DISABLED' for: {', '.join(pairs)}")
 
 
     def create_new_pair_table(self, conn, pair) -> None:
         """
-        creates a new single pair table within DB
+        creates a new single pair table within DB; nothing to do with consolidated
+        storage, whose shared table is created once by ensure_schema()
         """
-        table_name = f"ohlc_{pair}"
+        if self.storage == CONSOLIDATED_STORAGE:
+            return
+        self.create_candle_table(conn, f"ohlc_{pair}")
+        if self.has_timescale(conn):
+            self.create_continuous_aggregates(conn, pair)
+        logger.info(f"New DB table created for {pair}")
+
+
+    def create_candle_table(self,
+                            conn,
+                            table_name: str,
+                            compact: bool = COMPACT_SCHEMA,
+                            compress_after_days: int = COMPRESS_AFTER_DAYS) -> None:
+        """
+        creates a candle hypertable with its unique "timestamp" index and compression;
+        the compact schema stores float8 prices and no unique_pair_id.
+        Without TimescaleDB (e.g. a local benchmark DB) a plain table is created
+        """
+        if compact:
+            columns = """
+            "timestamp" TIMESTAMPTZ not null,
+            "open" DOUBLE PRECISION,
+            high DOUBLE PRECISION,
+            low DOUBLE PRECISION,
+            "close" DOUBLE PRECISION,
+            volume DOUBLE PRECISION
+            """
+        else:
+            columns = """
+            unique_pair_id INT,
+            "timestamp" TIMESTAMPTZ not null,
+            "open" NUMERIC(20, 12),
+            high NUMERIC(20, 12),
+            low NUMERIC(20, 12),
+            "close" NUMERIC(20, 12),
+            volume NUMERIC(28, 12)
+            """
         create_table_query = f"""--sql
-        CREATE TABLE IF NOT EXISTS {table_name} (
-        unique_pair_id INT,
+        CREATE TABLE IF NOT EXISTS {table_name} ({columns});
+        """
+        create_hypertable_query = f"""--sql
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+            SELECT 1
+            FROM timescaledb_information.hypertables
+            WHERE hypertable_name = '{table_name}'
+            ) THEN
+                PERFORM create_hypertable('{table_name}', by_range('timestamp'));
+            END IF;
+        END $$;
+        """
+        timescale = self.has_timescale(conn)
+        # pylint: disable = not-context-manager
+        cur = conn.cursor()
+        cur.execute(create_table_query)
+        if timescale:
+            cur.execute(create_hypertable_query)
+        self.create_timestamp_unique_index(conn, table_name)
+        self.forget_table_columns(table_name)
+        if timescale:
+            self.enable_compression(conn, table_name, compress_after_days)
+
+
+    def create_consolidated_table(self, conn) -> None:
+        """
+        creates the consolidated candle hypertable shared by all pairs:
+        compact columns keyed by (unique_pair_id, timestamp), partitioned by time
+        and by a hash of unique_pair_id, compressed and with its continuous aggregates
+        """
+        create_table_query = f"""--sql
+        CREATE TABLE IF NOT EXISTS {CONSOLIDATED_TABLE} (
+        unique_pair_id INT not null,
         "timestamp" TIMESTAMPTZ not null,
-        "open" NUMERIC(20, 12),
-        high NUMERIC(20, 12),
-        low NUMERIC(20, 12),
-        "close" NUMERIC(20, 12),
-        volume NUMERIC(28, 12)
+        "open" DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        "close" DOUBLE PRECISION,
+        volume DOUBLE PRECISION
         );
         """
         create_hypertable_query = f"""--sql
@@ -203,19 +708,159 @@ class DataHelper:
             IF NOT EXISTS (
             SELECT 1
             FROM timescaledb_information.hypertables
-            WHERE hypertable_name = 'ohlc_{pair}'
+            WHERE hypertable_name = '{CONSOLIDATED_TABLE}'
             ) THEN
-                PERFORM create_hypertable('ohlc_{pair}', by_range('timestamp'));
+                PERFORM create_hypertable('{CONSOLIDATED_TABLE}', by_range('timestamp'));
+                PERFORM add_dimension('{CONSOLIDATED_TABLE}',
+                                      by_hash('unique_pair_id', {OHLC_SPACE_PARTITIONS}));
             END IF;
         END $$;
         """
+        create_index_query = f"""--sql
+        CREATE UNIQUE INDEX IF NOT EXISTS {CONSOLIDATED_TABLE}_pair_timestamp_key
+        ON {CONSOLIDATED_TABLE} (unique_pair_id, "timestamp");
+        """
+        timescale = self.has_timescale(conn)
         # pylint: disable = not-context-manager
         cur = conn.cursor()
         cur.execute(create_table_query)
-        cur.execute(create_hypertable_query)
-        logger.info(f"New DB table created for {pair}")
+        if timescale:
+            cur.execute(create_hypertable_query)
+        cur.execute(create_index_query)
+        self.forget_table_columns(CONSOLIDATED_TABLE)
+        if timescale:
+            self.enable_compression(conn, CONSOLIDATED_TABLE)
+            self.create_continuous_aggregates(conn)
+
+
+    def create_timestamp_unique_index(self, conn, table_name: str) -> None:
+        """
+        one candle per minute: the unique index on "timestamp"
+        is the conflict target of insert_candles_to_db
+        """
+        create_index_query = sql.SQL("""--sql
+        CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ("timestamp");
+        """).format(sql.Identifier(f"{table_name}_timestamp_key"),
+                    sql.Identifier(table_name))
+        # pylint: disable = not-context-manager
+        cur = conn.cursor()
+        cur.execute(create_index_query)
+
+
+    def enable_compression(self,
+                           conn,
+                           table_name: str,
+                           compress_after_days: int = COMPRESS_AFTER_DAYS) -> None:
+        """
+        turns on native compression of a candle hypertable, ordered by time and
+        segmented by unique_pair_id where the table still has it, and adds a policy
+        compressing chunks older than `compress_after_days` (0 leaves compression off)
+        """
+        if compress_after_days <= 0:
+            return
+        compress_query = sql.SQL("""--sql
+        ALTER TABLE {} SET (timescaledb.compress,
+                            timescaledb.compress_orderby = '"timestamp" DESC',
+                            timescaledb.compress_segmentby = {});
+        """).format(sql.Identifier(table_name),
+                    sql.Literal("unique_pair_id" if self.has_pair_id_column(conn, table_name)
+                                else ""))
+        compression_policy_query = """--sql
+        SELECT add_compression_policy(%(table)s::REGCLASS,
+                                      compress_after => %(after)s,
+                                      if_not_exists => TRUE);
+        """
+        # pylint: disable = not-context-manager
+        cur = conn.cursor()
+        cur.execute(compress_query)
+        cur.execute(compression_policy_query,
+                    {"table": table_name, "after": datetime.timedelta(days=compress_after_days)})
+
+
+    def has_timescale(self, conn) -> bool:
+        """
+        True if the TimescaleDB extension is installed on DB, cached
+        """
+        if self._timescale is None:
+            cur = conn.cursor()
+            cur.execute("SELECT to_regclass('timescaledb_information.hypertables')")
+            self._timescale = cur.fetchone()[0] is not None
+        return self._timescale
+
 
+    def forget_table_columns(self, table_name: str) -> None:
+        """
+        drops the cached schema of a table that was created or replaced
+        """
+        self._pair_id_columns.pop(table_name, None)
+
+
+    def has_pair_id_column(self, conn, table_name: str) -> bool:
+        """
+        True for candle tables of the original schema, which repeat
+        unique_pair_id on every row; cached per table
+        """
+        if table_name not in self._pair_id_columns:
+            cur = conn.cursor()
+            cur.execute("""--sql
+            SELECT EXISTS (
+                SELECT 1
+                FROM information_schema.columns
+                WHERE table_name = %s AND column_name = 'unique_pair_id'
+            );
+            """, (table_name,))
+            self._pair_id_columns[table_name] = cur.fetchone()[0]
+        return self._pair_id_columns[table_name]
+
+
+    def create_continuous_aggregates(self, conn, pair: str | None = None) -> None:
+        """
+        creates empty continuous aggregates ohlc_<pair>_<timeframe>
+        (ohlc_<timeframe> over the consolidated table if no pair is given)
+        with refresh policies
+        """
+        # pylint: disable=import-outside-toplevel
+        from data_manager.resampler import AGGREGATED_TIMEFRAMES, TIMEFRAMES
+        create_aggregate_query = """--sql
+        CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+        WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+        SELECT {pair_id}time_bucket({bucket}, "timestamp") AS "timestamp",
+               first("open", "timestamp") AS "open",
+               max(high) AS high,
+               min(low) AS low,
+               last("close", "timestamp") AS "close",
+               sum(volume) AS volume
+        FROM {table}
+        GROUP BY {pair_id}time_bucket({bucket}, "timestamp")
+        WITH NO DATA;
+        """
+        refresh_policy_query = """--sql
+        SELECT add_continuous_aggregate_policy({view_name},
+                                               start_offset => NULL,
+                                               end_offset => {bucket},
+                                               schedule_interval => {schedule},
+                                               if_not_exists => TRUE);
+        """
+        table_name = CONSOLIDATED_TABLE if pair is None else f"ohlc_{pair}"
+        pair_id = sql.SQL("" if pair is not None else "unique_pair_id, ")
+        # pylint: disable = not-context-manager
+        cur = conn.cursor()
+        for timeframe in AGGREGATED_TIMEFRAMES:
+            view = candle_relation(table_name, timeframe)
+            bucket = sql.Literal(datetime.timedelta(seconds=TIMEFRAMES[timeframe]))
+            schedule = sql.Literal(datetime.timedelta(seconds=min(TIMEFRAMES[timeframe], 3600)))
+            cur.execute(sql.SQL(create_aggregate_query).format(view=sql.Identifier(view),
+                                                               pair_id=pair_id,
+                                                               bucket=bucket,
+                                                               table=sql.Identifier(table_name)))
+            cur.execute(sql.SQL(refresh_policy_query).format(view_name=sql.Literal(view),
+                                                             bucket=bucket,
+                                                             schedule=schedule))
+        logger.info(f"Continuous aggregates {', '.join(AGGREGATED_TIMEFRAMES)} "
+                    f"created for {table_name}")
 
+
+    @metrics.timed("db_call")
     def insert_new_pairs_to_main_table(self, new_pairs: list[dict]) -> None:
         """
         In case during trading status for pairs check new pairs are detected,
@@ -226,58 +871,131 @@ class DataHelper:
                                    pair_url,
                                    trading_enabled,
                                    "description",
-                                   minimum_order)
+                                   minimum_order,
+                                   last_checked_for_trading)
         VALUES (%(pair_name)s,
         %(pair_url)s,
         TRUE,
         %(description)s,
-        %(minimum_order)s)
+        %(minimum_order)s,
+        %(cur_time)s)
         """
         check_query = """--sql
         SELECT 1 FROM bitstamp_pairs WHERE pair_url = %(pair)s
         """
-        # pylint:disable = not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.unit_of_work(), self.connection() as conn:
             for pair in new_pairs:
                 cur = conn.cursor()
                 cur.execute(check_query, {"pair": pair["url_symbol"]})
                 exists = cur.fetchone()
                 if not exists:
                     try:
-                        cur.execute(
-                            insert_new_pair_query,
-                            {
-                                "pair_name": pair["name"],
-                                "pair_url": pair["url_symbol"],
-                                "description": pair["description"],
-                                "minimum_order": pair["minimum_order"],
-                            },
-                        )
-                        self.update_check_time(pair["url_symbol"])
-                        self.create_new_pair_table(conn, pair["url_symbol"])
-                        conn.commit()
-                        cur.close()
+                        # savepoint, so a failed pair does not abort the others
+                        with conn.transaction():
+                            cur.execute(
+                                insert_new_pair_query,
+                                {
+                                    "pair_name": pair["name"],
+                                    "pair_url": pair["url_symbol"],
+                                    "description": pair["description"],
+                                    "minimum_order": pair["minimum_order"],
+                                    "cur_time": self.cur_time,
+                                },
+                            )
+                            self.create_new_pair_table(conn, pair["url_symbol"])
                         logger.info(
                             f"""pair {pair["name"]} has been added to bitstamp_pairs table""")
                     except psycopg.errors.UniqueViolation as e:
                         logger.error(e)
-                        logger.error(f"pair {pair["name"]} already exists in the table")
+                        logger.error(f"pair {pair['name']} already exists in the table")
+                    except psycopg.Error as e:
+                        logger.error(f"pair {pair['name']} could not be added: {e}")
                     finally:
                         cur.close()
 
 
-    def insert_candles_to_db(self, df: pd.DataFrame, pair_url: str) -> None:
+    @metrics.timed("db_call")
+    def insert_candles_to_db(self,
+                             df: "pd.DataFrame",
+                             pair_url: str,
+                             batch_size: int = COPY_BATCH_SIZE,
+                             advance_checkpoint: bool = True) -> None:
         """
-        inserts given ohlc dataframe to DB
+        upserts ohlc dataframe through a binary COPY staging table,
+        committing every `batch_size` rows with the last_candle_unix checkpoint
+        (left as is for provisional candles, `advance_checkpoint=False`)
+        """
+        create_staging_query = """--sql
+        CREATE TEMP TABLE IF NOT EXISTS ohlc_staging (
+        unique_pair_id INT,
+        unix_timestamp BIGINT,
+        "open" DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        "close" DOUBLE PRECISION,
+        volume DOUBLE PRECISION
+        );
         """
-        df.to_sql(
-        f"ohlc_{pair_url}",
-        self.sqlalchemy_conn_str,
-        if_exists="append",
-        index=False)
+        copy_query = "COPY ohlc_staging FROM STDIN (FORMAT BINARY)"
+        insert_query = """--sql
+        INSERT INTO {table} AS candles ({pair_id}"timestamp", "open", high, low, "close", volume)
+        SELECT DISTINCT ON (unix_timestamp)
+               {pair_id}to_timestamp(unix_timestamp), "open", high, low, "close", volume
+        FROM ohlc_staging
+        ORDER BY unix_timestamp
+        ON CONFLICT ({conflict}) DO UPDATE
+        SET "open" = EXCLUDED."open",
+            high = EXCLUDED.high,
+            low = EXCLUDED.low,
+            "close" = EXCLUDED."close",
+            volume = EXCLUDED.volume
+        WHERE (candles."open", candles.high, candles.low, candles."close", candles.volume)
+              IS DISTINCT FROM
+              (EXCLUDED."open", EXCLUDED.high, EXCLUDED.low, EXCLUDED."close", EXCLUDED.volume);
+        {checkpoint}
+        TRUNCATE ohlc_staging;
+        """
+        checkpoint_query = """--sql
+        UPDATE bitstamp_pairs
+        SET last_candle_unix = GREATEST(last_candle_unix,
+                                        (SELECT max(unix_timestamp) FROM ohlc_staging))
+        WHERE pair_url = {pair_url};
+        """
+        # pylint: disable=import-outside-toplevel
+        from data_manager.ohlc_normalizer import df_to_array
+        candles = df_to_array(df)
+        rows = zip(df["unique_pair_id"].tolist(),
+                   *(candles[column].tolist() for column in candles.dtype.names))
+        started = time.perf_counter()
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(create_staging_query)
+            consolidated = self.storage == CONSOLIDATED_STORAGE
+            table_name = CONSOLIDATED_TABLE if consolidated else f"ohlc_{pair_url}"
+            pair_insert_query = sql.SQL(insert_query).format(
+                table=sql.Identifier(table_name),
+                pair_id=sql.SQL("unique_pair_id, " if self.has_pair_id_column(conn, table_name)
+                                else ""),
+                conflict=sql.SQL('unique_pair_id, "timestamp"' if consolidated else '"timestamp"'),
+                checkpoint=(sql.SQL(checkpoint_query).format(pair_url=sql.Literal(pair_url))
+                            if advance_checkpoint else sql.SQL("")),
+            )
+            for _ in range(0, len(df), batch_size):
+                with cur.copy(copy_query) as copy:
+                    copy.set_types(STAGING_TYPES)
+                    for row in itertools.islice(rows, batch_size):
+                        copy.write_row(row)
+                cur.execute(pair_insert_query)
+                self._commit(conn)
+        if self.candle_cache is not None:
+            self.candle_cache.write(pair_url, candles)
+        metrics.inc("candles_ingested_total", len(df), pair=pair_url)
+        elapsed = time.perf_counter() - started
+        logger.info(f"{len(df)} {pair_url} candles inserted in {elapsed:.2f}s "
+                    f"({len(df) / max(elapsed, 1e-9):,.0f} rows/s)")
 
 
     @property
+    @metrics.timed("db_call")
     def retrieve_pairs_without_start_timestamp(self) -> list[str]:
         """
         placeholder
@@ -290,42 +1008,41 @@ class DataHelper:
                 WHERE
                 start_timestamp IS NULL;
                 """
-        # pylint: disable=not-context-manager
-        with psycopg.connect(self.psycopg_conn_str) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(pairs_without_timestamp_query)
             results = cur.fetchall()
-            conn.commit()
             pairs_without_timestamp = [pair[0] for pair in results]
         return pairs_without_timestamp
 
 
+    @metrics.timed("db_call")
     def update_start_timestamp_in_main_table(
-        self, timestamp, unix_timestamp, connection, pair
+        self, timestamp, unix_timestamp, pair
     ):
         """
-        updates trading start time for specific trading pair
+        updates trading start time and check time for specific trading pair
         in the bitstamp_pairs table in DB
         """
         update_start_timestamp_query = """--sql
         UPDATE bitstamp_pairs
         SET start_timestamp = %(timestamp)s,
-            unix_timestamp = %(unix_timestamp)s
+            unix_timestamp = %(unix_timestamp)s,
+            last_checked_for_trading = %(cur_time)s
         WHERE
             pair_url = %(pair_url)s
         """
-        # pylint:disable=not-context-manager
-        with psycopg.connect(connection) as conn:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(
                 update_start_timestamp_query,
                 {
                     "timestamp": timestamp,
                     "unix_timestamp": unix_timestamp,
+                    "cur_time": self.cur_time,
                     "pair_url": pair,
                 },
             )
-            conn.commit()
-            logger.info(f"Start timestamp updated for: {pair}")
             cur.close()
-        self.update_check_time(pair)
+            self._commit(conn)
+        logger.info(f"Start timestamp updated for: {pair}")
@@ -0,0 +1,145 @@
+"""
+finds missing one-minute candles in ohlc_<pair> tables and backfills them:
+every pair is scanned only after its gap scan watermark, chunks that chunk
+statistics report as complete are skipped, and the holes found are refetched
+in page-aligned requests streamed into DB
+"""
+
+import time
+from loguru import logger
+import numpy as np
+from data_manager.candle_fetcher import (
+    CANDLE_STEP,
+    PAGE_INTERVAL,
+    AsyncCandleFetcher,
+)
+from data_manager.data_helper import DataHelper
+from data_manager.ohlc_normalizer import array_to_df, candles_to_array
+
+
+def find_gaps(timestamps: np.ndarray, start: int, end: int) -> np.ndarray:
+    """
+    [gap start, gap end) epoch pairs of the minutes missing in [start, end)
+    from time ordered candle `timestamps`, as an (n, 2) int64 array
+    """
+    edges = np.concatenate(([start - CANDLE_STEP], timestamps, [end])).astype(np.int64)
+    holes = np.flatnonzero(np.diff(edges) > CANDLE_STEP)
+    return np.column_stack((edges[holes] + CANDLE_STEP, edges[holes + 1]))
+
+
+def gap_pages(gaps: np.ndarray) -> list[int]:
+    """
+    start timestamps of the API pages covering all `gaps`,
+    gaps that fall into an already requested page do not add a request
+    """
+    pages: list[int] = []
+    covered = np.iinfo(np.int64).min
+    for gap_start, gap_end in gaps.tolist():
+        page_start = max(gap_start, covered)
+        while page_start < gap_end:
+            pages.append(page_start)
+            covered = page_start + PAGE_INTERVAL
+            page_start = covered
+    return pages
+
+
+def in_gaps(timestamps: np.ndarray, gaps: np.ndarray) -> np.ndarray:
+    """
+    boolean mask of the `timestamps` that fall into one of the sorted `gaps`
+    """
+    if not len(gaps):
+        return np.zeros(len(timestamps), dtype=bool)
+    index = np.searchsorted(gaps[:, 0], timestamps, side="right") - 1
+    return (index >= 0) & (timestamps < gaps[np.maximum(index, 0), 1])
+
+
+class GapScanner:
+    """
+    scans traded pairs for missing candles and refetches them
+    """
+    def __init__(self,
+                 data_helper: DataHelper | None = None,
+                 candle_fetcher: AsyncCandleFetcher | None = None) -> None:
+        self.data_helper = data_helper or DataHelper()
+        self.candle_fetcher = candle_fetcher or AsyncCandleFetcher()
+
+
+    def scan_windows(self, pair: str, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        parts of [start, end) that have to be read from DB: chunks lying inside
+        the range whose approximate row count matches the minutes they span are
+        left out, without chunk statistics the whole range is read
+        """
+        chunks = self.data_helper.retrieve_chunk_row_counts(pair, start, end)
+        if chunks is None:
+            return [(start, end)]
+        windows: list[tuple[int, int]] = []
+        cursor = start
+        for chunk_start, chunk_end, rows in chunks:
+            # the count covers the whole chunk, so a clipped chunk is always read
+            if (chunk_start < start or chunk_end > end
+                    or rows < (chunk_end - chunk_start) // CANDLE_STEP):
+                continue
+            if chunk_start > cursor:
+                windows.append((cursor, chunk_start))
+            cursor = max(cursor, chunk_end)
+        if cursor < end:
+            windows.append((cursor, end))
+        return windows
+
+
+    def scan(self, pair: str, start: int, end: int) -> np.ndarray:
+        """
+        gaps of a pair within [start, end), see find_gaps
+        """
+        start += -start % CANDLE_STEP
+        gaps = [find_gaps(self.data_helper.load_candles([pair], window_start, window_end,
+                                                        columns=())[pair]["timestamp"],
+                          window_start, window_end)
+                for window_start, window_end in self.scan_windows(pair, start, end)]
+        return np.concatenate(gaps) if gaps else np.empty((0, 2), dtype=np.int64)
+
+
+    def run(self, pairs: list[str] | None = None) -> dict[str, int]:
+        """
+        scans the given (or all traded) pairs after their watermarks and streams
+        the pages covering their gaps into DB; the watermark of a pair advances
+        once all its gaps are written. Returns {pair_url: candles filled}
+        """
+        started = time.perf_counter()
+        targets = self.data_helper.retrieve_gap_scan_targets(pairs)
+        gaps: dict[str, np.ndarray] = {}
+        pair_ids: dict[str, int] = {}
+        ends: dict[str, int] = {}
+        filled: dict[str, int] = {}
+        for unique_pair_id, pair, start, end in targets:
+            pair_gaps = self.scan(pair, start, end)
+            if len(pair_gaps):
+                gaps[pair], pair_ids[pair], ends[pair] = pair_gaps, unique_pair_id, end
+            else:
+                self.data_helper.update_gap_watermark(pair, end)
+                filled[pair] = 0
+        total = sum(int((pair_gaps[:, 1] - pair_gaps[:, 0]).sum()) // CANDLE_STEP
+                    for pair_gaps in gaps.values())
+        logger.info(f"Found {total} missing candles in {len(gaps)} of {len(targets)} pairs")
+
+        def write_page(pair: str, ohlc_list: list[dict] | None) -> None:
+            if ohlc_list is None:
+                return
+            candles = candles_to_array(ohlc_list)
+            candles = candles[in_gaps(candles["timestamp"], gaps[pair])]
+            if len(candles):
+                self.data_helper.insert_candles_to_db(array_to_df(candles, pair_ids[pair]), pair)
+            filled[pair] = filled.get(pair, 0) + len(candles)
+
+        def finish_pair(pair: str) -> None:
+            self.data_helper.update_gap_watermark(pair, ends[pair])
+            filled.setdefault(pair, 0)
+
+        if gaps:
+            self.candle_fetcher.run_until_complete(self.candle_fetcher.stream_pages(
+                {pair: gap_pages(pair_gaps) for pair, pair_gaps in gaps.items()},
+                write_page, done=finish_pair))
+        logger.info(f"Backfilled {sum(filled.values())} candles "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return filled
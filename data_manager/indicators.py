@@ -0,0 +1,337 @@
+"""
+incremental technical indicators over CANDLE_DTYPE arrays:
+every indicator carries the state it needs between batches, so a new batch
+of candles is computed from that state instead of the whole history.
+Recurrences (EMA, Wilder smoothing) are evaluated block-wise in closed form,
+without a Python loop over candles
+"""
+
+import abc
+import os
+import numpy as np
+from dotenv import load_dotenv
+from data_manager.data_helper import DataHelper
+from data_manager.metrics import get_metrics
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+load_dotenv()
+
+metrics = get_metrics()
+
+# minutes of history loaded to warm up indicators of a pair seen for the first time
+INDICATOR_WARMUP_MINUTES = int(os.getenv("INDICATOR_WARMUP_MINUTES", "1440"))
+# keeps decay ** -block within float64 range in ema()
+MAX_EMA_SCALE_EXPONENT = 150 * np.log(10)
+ROLLING_BLOCK = 4096
+
+
+def ema(values: np.ndarray, alpha: float, initial: float = np.nan) -> np.ndarray:
+    """
+    y[t] = (1 - alpha) * y[t - 1] + alpha * x[t] with y[-1] = `initial`
+    (the first value if NaN); within a block the recurrence is unrolled to
+    y[j] = d^(j+1) * (y[-1] + alpha * cumsum(x[k] * d^-(k+1))), d = 1 - alpha
+    """
+    result = np.empty(len(values), dtype=np.float64)
+    if not len(values):
+        return result
+    decay = 1.0 - alpha
+    previous = values[0] if np.isnan(initial) else initial
+    if decay <= 0.0:
+        result[:] = values
+        return result
+    block = max(1, min(len(values), int(MAX_EMA_SCALE_EXPONENT / -np.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        chunk_powers = powers[:len(chunk)]
+        smoothed = chunk_powers * (previous + alpha * np.cumsum(chunk / chunk_powers))
+        result[start:start + len(chunk)] = smoothed
+        previous = smoothed[-1]
+    return result
+
+
+def rolling_moments(window: np.ndarray, period: int,
+                    with_std: bool = False) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    means (and population standard deviations) of every `period` long window
+    of `window`, len(window) - period + 1 values; cumulative sums are taken
+    block-wise relative to the block's first value to limit cancellation
+    """
+    count = max(0, len(window) - period + 1)
+    means = np.empty(count, dtype=np.float64)
+    stds = np.empty(count, dtype=np.float64) if with_std else None
+    for start in range(0, count, ROLLING_BLOCK):
+        part = window[start:start + ROLLING_BLOCK + period - 1]
+        centered = part - part[0]
+        sums = np.concatenate(([0.0], np.cumsum(centered)))
+        block_means = (sums[period:] - sums[:-period]) / period
+        means[start:start + len(block_means)] = block_means + part[0]
+        if with_std:
+            squares = np.concatenate(([0.0], np.cumsum(centered * centered)))
+            variance = (squares[period:] - squares[:-period]) / period - block_means * block_means
+            stds[start:start + len(block_means)] = np.sqrt(np.maximum(variance, 0.0))
+    return means, stds
+
+
+class Indicator(abc.ABC):
+    """
+    base of incremental indicators: update() takes the next time ordered
+    candles and returns one output array per name in `names`
+    """
+    names: tuple[str, ...] = ()
+
+    @abc.abstractmethod
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        """
+        indicator values of `candles`, continuing from the carried state
+        """
+
+
+class WindowIndicator(Indicator):
+    """
+    indicator over the last `period` closes, carries the previous period - 1 closes
+    """
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.tail = np.empty(0, dtype=np.float64)
+
+
+    def window(self, closes: np.ndarray) -> tuple[np.ndarray, int]:
+        """
+        (carried tail + closes, number of leading values without a full window)
+        """
+        window = np.concatenate((self.tail, closes))
+        # copied, a view would keep the whole batch alive
+        self.tail = window[max(0, len(window) - self.period + 1):].copy()
+        return window, min(len(closes), max(0, self.period - 1 - (len(window) - len(closes))))
+
+
+class SMA(WindowIndicator):
+    """
+    simple moving average of close
+    """
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self.names = (f"sma_{period}",)
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        window, missing = self.window(candles["close"])
+        result = np.full(len(candles), np.nan)
+        if len(candles) > missing:
+            means, _ = rolling_moments(window, self.period)
+            result[missing:] = means[-(len(candles) - missing):]
+        return (result,)
+
+
+class Bollinger(WindowIndicator):
+    """
+    Bollinger bands: SMA of close -/+ `width` population standard deviations
+    """
+    def __init__(self, period: int = 20, width: float = 2.0) -> None:
+        super().__init__(period)
+        self.width = width
+        self.names = (f"bb_mid_{period}", f"bb_upper_{period}", f"bb_lower_{period}")
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        window, missing = self.window(candles["close"])
+        mid = np.full(len(candles), np.nan)
+        deviation = np.full(len(candles), np.nan)
+        if len(candles) > missing:
+            means, stds = rolling_moments(window, self.period, with_std=True)
+            mid[missing:] = means[-(len(candles) - missing):]
+            deviation[missing:] = stds[-(len(candles) - missing):]
+        return mid, mid + self.width * deviation, mid - self.width * deviation
+
+
+class EMA(Indicator):
+    """
+    exponential moving average of close, alpha = 2 / (period + 1)
+    """
+    def __init__(self, period: int) -> None:
+        self.alpha = 2.0 / (period + 1)
+        self.value = np.nan
+        self.names = (f"ema_{period}",)
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        result = ema(candles["close"], self.alpha, self.value)
+        if len(result):
+            self.value = result[-1]
+        return (result,)
+
+
+class RSI(Indicator):
+    """
+    relative strength index with Wilder's smoothing (alpha = 1 / period)
+    """
+    def __init__(self, period: int = 14) -> None:
+        self.alpha = 1.0 / period
+        self.close = np.nan
+        self.gain = np.nan
+        self.loss = np.nan
+        self.names = (f"rsi_{period}",)
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        result = np.full(len(candles), np.nan)
+        closes = np.concatenate(([self.close], candles["close"]))
+        first = 1 if np.isnan(self.close) else 0
+        if len(closes) - 1 > first:
+            changes = np.diff(closes[first:])
+            gains = ema(np.maximum(changes, 0.0), self.alpha, self.gain)
+            losses = ema(np.maximum(-changes, 0.0), self.alpha, self.loss)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[first:] = np.where(losses == 0.0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+            self.gain, self.loss = gains[-1], losses[-1]
+        if len(candles):
+            self.close = candles["close"][-1]
+        return (result,)
+
+
+class ATR(Indicator):
+    """
+    average true range with Wilder's smoothing
+    """
+    def __init__(self, period: int = 14) -> None:
+        self.alpha = 1.0 / period
+        self.close = np.nan
+        self.value = np.nan
+        self.names = (f"atr_{period}",)
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        previous = np.concatenate(([self.close], candles["close"][:-1]))
+        true_range = np.fmax(candles["high"] - candles["low"],
+                             np.fmax(np.abs(candles["high"] - previous),
+                                     np.abs(candles["low"] - previous)))
+        result = ema(true_range, self.alpha, self.value)
+        if len(candles):
+            self.close = candles["close"][-1]
+            self.value = result[-1]
+        return (result,)
+
+
+class VWAP(Indicator):
+    """
+    volume weighted average typical price since the start of the UTC day
+    """
+    names = ("vwap",)
+
+    def __init__(self) -> None:
+        self.day = -1
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+
+    def update(self, candles: np.ndarray) -> tuple[np.ndarray, ...]:
+        if not len(candles):
+            return (np.empty(0, dtype=np.float64),)
+        days = candles["timestamp"] // 86400
+        volume = np.nan_to_num(candles["volume"])
+        price_volume = (candles["high"] + candles["low"] + candles["close"]) / 3 * volume
+        new_day = np.concatenate(([days[0] != self.day], days[1:] != days[:-1]))
+        day_start = np.maximum.accumulate(np.where(new_day, np.arange(len(candles)), 0))
+        cumulative_pv = np.cumsum(price_volume)
+        cumulative_volume = np.cumsum(volume)
+        before_pv = np.where(day_start > 0, cumulative_pv[day_start - 1], 0.0)
+        before_volume = np.where(day_start > 0, cumulative_volume[day_start - 1], 0.0)
+        carried = (day_start == 0) & ~new_day[0]
+        day_pv = cumulative_pv - before_pv + np.where(carried, self.price_volume, 0.0)
+        day_volume = cumulative_volume - before_volume + np.where(carried, self.volume, 0.0)
+        self.day, self.price_volume, self.volume = days[-1], day_pv[-1], day_volume[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (np.where(day_volume > 0, day_pv / day_volume, np.nan),)
+
+
+def default_indicators() -> list[Indicator]:
+    """
+    indicator set computed for every pair unless configured otherwise
+    """
+    return [SMA(20), SMA(200), EMA(12), EMA(26), RSI(14), ATR(14), Bollinger(20, 2.0), VWAP()]
+
+
+class IndicatorSet:
+    """
+    indicators of a single pair, fed with its candles in chronological order;
+    candles not newer than the last one seen are ignored
+    """
+    def __init__(self, indicators: list[Indicator] | None = None) -> None:
+        self.indicators = indicators if indicators is not None else default_indicators()
+        self.dtype = np.dtype([("timestamp", np.int64)]
+                              + [(name, np.float64)
+                                 for indicator in self.indicators for name in indicator.names])
+        self.last_timestamp = np.iinfo(np.int64).min
+        self.latest: np.ndarray | None = None
+
+
+    def update(self, candles: np.ndarray) -> np.ndarray:
+        """
+        indicator values of the new candles as a structured array with "timestamp"
+        and a field per indicator output
+        """
+        candles = candles[candles["timestamp"] > self.last_timestamp]
+        values = np.empty(len(candles), dtype=self.dtype)
+        values["timestamp"] = candles["timestamp"]
+        for indicator in self.indicators:
+            for name, output in zip(indicator.names, indicator.update(candles)):
+                values[name] = output
+        if len(candles):
+            self.last_timestamp = int(candles["timestamp"][-1])
+            self.latest = values[-1:].copy()[0]
+        return values
+
+
+class IndicatorEngine:
+    """
+    IndicatorSet per pair; a pair seen for the first time is warmed up
+    with INDICATOR_WARMUP_MINUTES of candles stored before its first new candle,
+    the latest values of every pair are exported as indicator_value gauges
+    """
+    def __init__(self,
+                 data_helper: DataHelper | None = None,
+                 indicators=default_indicators,
+                 warmup_minutes: int = INDICATOR_WARMUP_MINUTES) -> None:
+        self.data_helper = data_helper
+        self.indicators = indicators
+        self.warmup_minutes = warmup_minutes
+        self.sets: dict[str, IndicatorSet] = {}
+
+
+    def update(self, pair: str, candles: np.ndarray) -> np.ndarray:
+        """
+        indicator values of the new candles of a pair
+        """
+        if pair not in self.sets:
+            self.sets[pair] = IndicatorSet(self.indicators())
+            if self.data_helper is not None and self.warmup_minutes and len(candles):
+                first = int(candles["timestamp"][0])
+                history = self.data_helper.load_candles([pair], first - self.warmup_minutes * 60,
+                                                        first)[pair]
+                self.sets[pair].update(history.astype(CANDLE_DTYPE))
+        values = self.sets[pair].update(candles)
+        self.export(pair)
+        return values
+
+
+    def export(self, pair: str) -> None:
+        """
+        sets the indicator_value gauges of a pair to its latest values,
+        indicators without a value yet (NaN) are left out
+        """
+        latest = self.sets[pair].latest
+        if latest is None:
+            return
+        for name in latest.dtype.names[1:]:
+            if not np.isnan(latest[name]):
+                metrics.set_gauge("indicator_value", float(latest[name]),
+                                  pair=pair, indicator=name)
+
+
+    def latest(self) -> dict[str, np.ndarray]:
+        """
+        {pair: latest indicator values}
+        """
+        return {pair: indicator_set.latest for pair, indicator_set in self.sets.items()
+                if indicator_set.latest is not None}
@@ -0,0 +1,290 @@
+"""
+live one-minute candles built from Bitstamp's live trades websocket:
+trades are folded into per-pair bars in memory, every pair keeps its latest
+bars in a NumPy ring buffer and closed bars are flushed to DB within a second.
+Live bars are provisional, the API update still fetches the official candles
+and replaces them
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from collections.abc import Callable
+from loguru import logger
+import aiohttp
+import numpy as np
+from dotenv import load_dotenv
+from data_manager.api_client import LatencyStats, backoff_delay
+from data_manager.candle_fetcher import CANDLE_STEP
+from data_manager.data_helper import DataHelper
+from data_manager.ohlc_normalizer import CANDLE_DTYPE, array_to_df
+
+load_dotenv()
+
+LIVE_WS_URL = os.getenv("BITSTAMP_WS_URL", "wss://ws.bitstamp.net")
+RING_BUFFER_BARS = int(os.getenv("LIVE_RING_BUFFER_BARS", "1440"))
+# trades of a minute may still arrive shortly after the minute ended
+BAR_CLOSE_DELAY = float(os.getenv("LIVE_BAR_CLOSE_DELAY", "0.5"))
+FLUSH_INTERVAL = 0.25
+
+Bar = tuple[int, float, float, float, float, float]
+
+
+class BarRing:
+    """
+    fixed-size ring buffer of the latest CANDLE_DTYPE bars of a pair
+    """
+    def __init__(self, size: int = RING_BUFFER_BARS) -> None:
+        self.bars = np.zeros(size, dtype=CANDLE_DTYPE)
+        self.appended = 0
+
+
+    def __len__(self) -> int:
+        return min(self.appended, len(self.bars))
+
+
+    def append(self, bar: Bar) -> None:
+        """
+        stores a bar, overwriting the oldest one once the ring is full
+        """
+        self.bars[self.appended % len(self.bars)] = bar
+        self.appended += 1
+
+
+    def latest(self, count: int | None = None) -> np.ndarray:
+        """
+        copy of up to `count` (default all) latest bars in chronological order
+        """
+        count = len(self) if count is None else min(count, len(self))
+        return self.bars[np.arange(self.appended - count, self.appended) % len(self.bars)]
+
+
+class BarBuilder:
+    """
+    folds the trades of a single pair into one-minute bars
+    """
+    def __init__(self) -> None:
+        self.bar: list | None = None
+        self.closed_until = 0
+
+
+    def add_trade(self, timestamp: float, price: float, amount: float) -> Bar | None:
+        """
+        adds a trade to the bar of its minute, returns the previous bar
+        if the trade opened a new minute; late trades of earlier minutes are dropped
+        """
+        minute = int(timestamp) - int(timestamp) % CANDLE_STEP
+        if minute < self.closed_until or (self.bar is not None and minute < self.bar[0]):
+            return None
+        closed = self.close() if self.bar is not None and minute > self.bar[0] else None
+        if self.bar is None:
+            self.bar = [minute, price, price, price, price, amount]
+        else:
+            self.bar[2] = max(self.bar[2], price)
+            self.bar[3] = min(self.bar[3], price)
+            self.bar[4] = price
+            self.bar[5] += amount
+        return closed
+
+
+    def close_before(self, now: float) -> Bar | None:
+        """
+        closes the open bar once its minute (plus BAR_CLOSE_DELAY) is over
+        """
+        if self.bar is not None and now >= self.bar[0] + CANDLE_STEP + BAR_CLOSE_DELAY:
+            return self.close()
+        return None
+
+
+    def close(self) -> Bar:
+        """
+        closes and returns the open bar
+        """
+        bar = tuple(self.bar)
+        self.closed_until = self.bar[0] + CANDLE_STEP
+        self.bar = None
+        return bar
+
+
+class LiveCandleStream:
+    """
+    subscribes to live trades of `pairs` ({pair_url: unique_pair_id}), keeps
+    their latest bars in ring buffers and passes closed bars to `sink(pair, bars)`,
+    by default a provisional insert to DB; reconnects with backoff until stopped
+    """
+    def __init__(self,
+                 pairs: dict[str, int],
+                 data_helper: DataHelper | None = None,
+                 ws_url: str = LIVE_WS_URL,
+                 ring_size: int = RING_BUFFER_BARS,
+                 sink: Callable[[str, np.ndarray], None] | None = None,
+                 on_bar: Callable[[str, Bar], None] | None = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.pairs = pairs
+        self.data_helper = data_helper or (DataHelper() if sink is None else None)
+        self.ws_url = ws_url
+        self.sink = sink or self.insert_bars
+        self.on_bar = on_bar
+        self.clock = clock
+        self.builders = {pair: BarBuilder() for pair in pairs}
+        self.rings = {pair: BarRing(ring_size) for pair in pairs}
+        self.latency = LatencyStats()
+        self.trades_received = 0
+        self.bars_flushed = 0
+        self._pending: dict[str, list[Bar]] = {pair: [] for pair in pairs}
+        self._stop: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+
+    @classmethod
+    def for_traded_pairs(cls, data_helper: DataHelper | None = None, **kwargs) -> "LiveCandleStream":
+        """
+        stream of all pairs with trading enabled on DB
+        """
+        data_helper = data_helper or DataHelper()
+        traded = data_helper.retrieve_traded_pairs_from_db
+        return cls(dict(zip(traded["pair_url"], traded["unique_pair_id"].astype(int))),
+                   data_helper, **kwargs)
+
+
+    def insert_bars(self, pair: str, bars: np.ndarray) -> None:
+        """
+        default sink: provisional insert that leaves the pair's checkpoint as is
+        """
+        self.data_helper.insert_candles_to_db(array_to_df(bars, self.pairs[pair]), pair,
+                                              advance_checkpoint=False)
+
+
+    def handle_message(self, message: dict) -> bool:
+        """
+        processes a single websocket message,
+        returns False if the server asked to reconnect
+        """
+        event = message.get("event")
+        if event == "trade":
+            pair = message["channel"].removeprefix("live_trades_")
+            trade = message["data"]
+            timestamp = (int(trade["microtimestamp"]) / 1_000_000 if "microtimestamp" in trade
+                         else float(trade["timestamp"]))
+            self.trades_received += 1
+            self._add_bar(pair, self.builders[pair].add_trade(timestamp,
+                                                              float(trade["price"]),
+                                                              float(trade["amount"])))
+        elif event == "bts:request_reconnect":
+            logger.info("Live trades server requested a reconnect")
+            return False
+        return True
+
+
+    def close_bars(self, now: float) -> None:
+        """
+        closes bars of the minutes that are over, also for pairs without new trades
+        """
+        for pair, builder in self.builders.items():
+            self._add_bar(pair, builder.close_before(now))
+
+
+    def _add_bar(self, pair: str, bar: Bar | None) -> None:
+        if bar is None:
+            return
+        self.rings[pair].append(bar)
+        self._pending[pair].append(bar)
+        if self.on_bar is not None:
+            self.on_bar(pair, bar)
+
+
+    async def flush(self) -> None:
+        """
+        passes closed bars to the sink in a worker thread, records how long
+        after the end of its minute every flushed bar reached the sink
+        """
+        for pair, bars in self._pending.items():
+            if not bars:
+                continue
+            self._pending[pair] = []
+            try:
+                await asyncio.to_thread(self.sink, pair, np.array(bars, dtype=CANDLE_DTYPE))
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                logger.error(f"Failed to flush live bars of {pair}: {error!r}")
+                continue
+            flushed = self.clock()
+            for bar in bars:
+                self.latency.record("bar_flush", flushed - bar[0] - CANDLE_STEP)
+            self.bars_flushed += len(bars)
+
+
+    async def _flush_loop(self) -> None:
+        while not self._stop.is_set():
+            self.close_bars(self.clock())
+            await self.flush()
+            try:
+                await asyncio.wait_for(self._stop.wait(), FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        await self.flush()
+
+
+    async def _consume(self, session: aiohttp.ClientSession) -> None:
+        async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+            for pair in self.pairs:
+                await ws.send_json({"event": "bts:subscribe",
+                                    "data": {"channel": f"live_trades_{pair}"}})
+            logger.info(f"Subscribed to live trades of {len(self.pairs)} pairs")
+            async for message in ws:
+                if message.type is not aiohttp.WSMsgType.TEXT:
+                    break
+                if not self.handle_message(json.loads(message.data)):
+                    break
+
+
+    async def run(self) -> None:
+        """
+        streams until stop() is called, then flushes the bars closed so far
+        """
+        self._stop = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        attempt = 0
+        async with aiohttp.ClientSession() as session:
+            flusher = asyncio.create_task(self._flush_loop())
+            stopped = asyncio.create_task(self._stop.wait())
+            try:
+                while not self._stop.is_set():
+                    consumer = asyncio.create_task(self._consume(session))
+                    await asyncio.wait({consumer, stopped}, return_when=asyncio.FIRST_COMPLETED)
+                    if self._stop.is_set():
+                        consumer.cancel()
+                        break
+                    try:
+                        consumer.result()
+                        attempt = 0
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                        logger.warning(f"Live trades connection failed: {error!r}")
+                    delay = backoff_delay(attempt, None)
+                    attempt += 1
+                    await asyncio.wait({stopped}, timeout=delay)
+            finally:
+                self._stop.set()
+                stopped.cancel()
+                await flusher
+        logger.info(f"Live stream stopped: {self.trades_received} trades, "
+                    f"{self.bars_flushed} bars flushed")
+        self.latency.log_summary()
+
+
+    def stop(self, *_) -> None:
+        """
+        stops the stream, safe to call from signal handlers and other threads
+        """
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+
+    def run_forever(self) -> None:
+        """
+        synchronous entry point, stops on SIGINT / SIGTERM
+        """
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        asyncio.run(self.run())
@@ -0,0 +1,256 @@
+"""
+in-process metrics of the collector: counters, gauges and timing spans,
+exported in the Prometheus text format to a file (for the node exporter
+textfile collector or a quick look) or over HTTP, plus optional
+cProfile / pyinstrument capture of a whole run. Needs no heavy imports,
+so instrumented modules stay cheap to import
+"""
+
+import functools
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+from loguru import logger
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+load_dotenv()
+
+METRICS_PREFIX = "trading_bot_"
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+PROFILER = os.getenv("PROFILER", "")
+PROFILE_DIR = Path(os.getenv(
+    "PROFILE_DIR",
+    Path(__file__).resolve().parent.parent / "logs" / "profiles"))
+PROFILERS = ("cprofile", "pyinstrument")
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def format_labels(labels: Labels) -> str:
+    """
+    {name="value",...} with Prometheus escaping, empty without labels
+    """
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"'
+                          for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class Metrics:
+    """
+    thread-safe registry; spans keep count, total and max seconds
+    per name and label set
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.gauges: dict[tuple[str, Labels], float] = {}
+        self.spans: dict[tuple[str, Labels], list[float]] = {}
+        self._server: "ThreadingHTTPServer | None" = None
+
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, object]) -> tuple[str, Labels]:
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        adds `value` to a counter
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """
+        sets a gauge to `value`
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        records a single duration of span `name`
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            stats = self.spans.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """
+        times the block, failed blocks are recorded too
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+
+    def timed(self, name: str, **labels) -> Callable:
+        """
+        decorator timing every call as span `name`, labelled with the function name
+        """
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, call=func.__name__, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+    def reset(self) -> None:
+        """
+        forgets all recorded values
+        """
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.spans.clear()
+
+
+    def render(self) -> str:
+        """
+        all metrics in the Prometheus text exposition format
+        """
+        lines: list[str] = []
+
+        def add(kind: str, values: dict[tuple[str, Labels], float]) -> None:
+            declared = set()
+            for (name, labels), value in sorted(values.items()):
+                metric = METRICS_PREFIX + name
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} {kind}")
+                    declared.add(metric)
+                lines.append(f"{metric}{format_labels(labels)} {value:.17g}")
+
+        with self._lock:
+            add("counter", self.counters)
+            add("gauge", self.gauges)
+            declared = set()
+            for (name, labels), (count, total, _) in sorted(self.spans.items()):
+                metric = f"{METRICS_PREFIX}{name}_seconds"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} summary")
+                    declared.add(metric)
+                lines.append(f"{metric}_count{format_labels(labels)} {count:.17g}")
+                lines.append(f"{metric}_sum{format_labels(labels)} {total:.17g}")
+            add("gauge", {(f"{name}_seconds_max", labels): stats[2]
+                          for (name, labels), stats in self.spans.items()})
+        return "\n".join(lines) + "\n"
+
+
+    def write(self, path: str | Path) -> None:
+        """
+        replaces `path` with the current metrics in one step,
+        so readers never see a partially written file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> None:
+        """
+        serves the metrics on http://host:port/metrics from a daemon thread
+        """
+        if self._server is not None:
+            return
+        # pylint: disable=import-outside-toplevel
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            answers every GET with the rendered metrics
+            """
+            def log_message(self, *args) -> None:  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                """
+                serves the metrics
+                """
+                payload = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        logger.info(f"Serving metrics on http://{host}:{self._server.server_address[1]}/metrics")
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """
+    process-wide metrics registry
+    """
+    return _metrics
+
+
+@contextmanager
+def profiled(run_name: str, profiler: str = PROFILER) -> Iterator[None]:
+    """
+    captures a profile of the block into PROFILE_DIR with `profiler`
+    ("cprofile": .prof for pstats / snakeviz, "pyinstrument": .html); no-op if empty
+    """
+    if not profiler:
+        yield
+        return
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {profiler}")
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = PROFILE_DIR / f"{run_name}-{time.strftime('%Y%m%d-%H%M%S')}"
+    if profiler == "cprofile":
+        import cProfile  # pylint: disable=import-outside-toplevel
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(stem.with_suffix(".prof"))
+            logger.info(f"cProfile written to {stem.with_suffix('.prof')}")
+        return
+    try:
+        from pyinstrument import Profiler  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        logger.warning("pyinstrument is not installed, running without profiling")
+        yield
+        return
+    sampler = Profiler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        stem.with_suffix(".html").write_text(sampler.output_html(), encoding="utf-8")
+        logger.info(f"pyinstrument profile written to {stem.with_suffix('.html')}")
@@ -0,0 +1,407 @@
+"""
+one-off schema migrations of the collector database
+
+    python -m data_manager.migrations <migration name>
+
+databases created before a migration existed need them in this order:
+
+    checkpoints      last_candle_unix column (applied automatically)
+    aggregates       multi-timeframe continuous aggregates of old pair tables
+    gap_watermarks   gap_scan_unix column (applied automatically)
+    deduplicate      unique "timestamp" index of old pair tables (required)
+    compression      compression of old pair tables
+    compact          optional, float8 pair tables
+    consolidate      optional, single ohlc table, then set OHLC_STORAGE=consolidated
+                     (a new consolidated DB gets the table automatically)
+
+collector commands call ensure_schema() first, which applies the automatic
+ones and stops with the name of a required migration that has not been run
+"""
+
+import argparse
+from loguru import logger
+from psycopg import sql
+from data_manager.data_helper import (
+    CONSOLIDATED_STORAGE,
+    CONSOLIDATED_TABLE,
+    PER_PAIR_STORAGE,
+    DataHelper,
+)
+
+
+class MissingMigrationError(RuntimeError):
+    """
+    raised when DB lacks a migration that has to be run by hand
+    """
+
+
+def add_candle_checkpoints(data_helper: DataHelper | None = None) -> None:
+    """
+    adds last_candle_unix checkpoint column to bitstamp_pairs and seeds it
+    with the last stored candle of every pair that does not have one yet
+    """
+    data_helper = data_helper or DataHelper()
+    add_column_query = """--sql
+    ALTER TABLE bitstamp_pairs
+    ADD COLUMN IF NOT EXISTS last_candle_unix BIGINT;
+    """
+    pairs_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs
+    WHERE last_candle_unix IS NULL;
+    """
+    seed_query = """--sql
+    UPDATE bitstamp_pairs
+    SET last_candle_unix = (SELECT extract(epoch FROM max("timestamp"))::BIGINT FROM {})
+    WHERE pair_url = {};
+    """
+    with data_helper.unit_of_work(), data_helper.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(add_column_query)
+        cur.execute(pairs_query)
+        pairs = [row[0] for row in cur.fetchall()]
+        for pair in pairs:
+            cur.execute("SELECT to_regclass(%s)", (f"ohlc_{pair}",))
+            if cur.fetchone()[0] is None:
+                continue
+            cur.execute(sql.SQL(seed_query).format(sql.Identifier(f"ohlc_{pair}"),
+                                                   sql.Literal(pair)))
+        cur.close()
+    logger.info(f"Candle checkpoints seeded for {len(pairs)} pairs")
+
+
+def add_continuous_aggregates(data_helper: DataHelper | None = None) -> None:
+    """
+    creates the multi-timeframe continuous aggregates for every pair table
+    created before pair onboarding did it; the aggregates are empty
+    until the first run of their refresh policy, which materializes whole history
+    """
+    data_helper = data_helper or DataHelper()
+    pairs_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs;
+    """
+    with data_helper.unit_of_work(), data_helper.connection() as conn:
+        if not data_helper.has_timescale(conn):
+            logger.info("No TimescaleDB, continuous aggregates skipped")
+            return
+        cur = conn.cursor()
+        cur.execute(pairs_query)
+        pairs = [row[0] for row in cur.fetchall()]
+        for pair in pairs:
+            cur.execute("SELECT to_regclass(%s)", (f"ohlc_{pair}",))
+            if cur.fetchone()[0] is None:
+                continue
+            data_helper.create_continuous_aggregates(conn, pair)
+        cur.close()
+    logger.info(f"Continuous aggregates ensured for {len(pairs)} pairs")
+
+
+def add_gap_watermarks(data_helper: DataHelper | None = None) -> None:
+    """
+    adds gap_scan_unix watermark column to bitstamp_pairs,
+    pairs without a watermark are scanned from their start on the next gap scan
+    """
+    data_helper = data_helper or DataHelper()
+    add_column_query = """--sql
+    ALTER TABLE bitstamp_pairs
+    ADD COLUMN IF NOT EXISTS gap_scan_unix BIGINT;
+    """
+    with data_helper.unit_of_work(), data_helper.connection() as conn:
+        conn.execute(add_column_query)
+    logger.info("Gap scan watermarks added")
+
+
+def deduplicate_candles(data_helper: DataHelper | None = None) -> None:
+    """
+    removes duplicate candles (same "timestamp") from every pair table
+    and adds the unique "timestamp" index the upserting insert relies on;
+    hypertables are cleaned chunk by chunk, each chunk in its own transaction,
+    duplicates never span chunks as chunks are partitioned by time
+    """
+    data_helper = data_helper or DataHelper()
+    pairs_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs;
+    """
+    chunks_query = """--sql
+    SELECT show_chunks(%(table)s)::TEXT
+    FROM timescaledb_information.hypertables
+    WHERE hypertable_name = %(table)s;
+    """
+    deduplicate_query = """--sql
+    DELETE FROM {chunk} AS candles
+    USING (
+        SELECT ctid,
+               row_number() OVER (PARTITION BY "timestamp" ORDER BY ctid DESC) AS copy_number
+        FROM {chunk}
+    ) AS copies
+    WHERE candles.ctid = copies.ctid
+      AND copies.copy_number > 1;
+    """
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(pairs_query)
+        pairs = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT to_regclass('timescaledb_information.hypertables')")
+        timescale = cur.fetchone()[0] is not None
+        conn.commit()
+        for pair in pairs:
+            table = f"ohlc_{pair}"
+            cur.execute("SELECT to_regclass(%s)", (table,))
+            if cur.fetchone()[0] is None:
+                continue
+            # show_chunks() names come already quoted
+            chunks = [sql.Identifier(table)]
+            if timescale:
+                cur.execute(chunks_query, {"table": table})
+                chunks = [sql.SQL(row[0]) for row in cur.fetchall()] or chunks
+            removed = 0
+            for chunk in chunks:
+                cur.execute(sql.SQL(deduplicate_query).format(chunk=chunk))
+                removed += cur.rowcount
+                conn.commit()
+            data_helper.create_timestamp_unique_index(conn, table)
+            conn.commit()
+            logger.info(f"{removed} duplicate candles removed from {table}")
+        cur.close()
+
+
+def enable_compression(data_helper: DataHelper | None = None) -> None:
+    """
+    turns on compression and the compression policy for every pair table
+    """
+    data_helper = data_helper or DataHelper()
+    pairs_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs;
+    """
+    with data_helper.connection() as conn:
+        if not data_helper.has_timescale(conn):
+            logger.info("No TimescaleDB, compression skipped")
+            return
+        cur = conn.cursor()
+        cur.execute(pairs_query)
+        pairs = [row[0] for row in cur.fetchall()]
+        for pair in pairs:
+            cur.execute("SELECT to_regclass(%s)", (f"ohlc_{pair}",))
+            if cur.fetchone()[0] is None:
+                continue
+            data_helper.enable_compression(conn, f"ohlc_{pair}")
+            conn.commit()
+        cur.close()
+    logger.info(f"Compression enabled for {len(pairs)} pairs")
+
+
+def chunk_ranges(conn, table: str, timescale: bool) -> list[tuple]:
+    """
+    (start, end) time ranges of the hypertable's chunks in order,
+    a single range spanning all candles of a plain table; the read is committed
+    """
+    chunk_ranges_query = """--sql
+    SELECT range_start, range_end
+    FROM timescaledb_information.chunks
+    WHERE hypertable_name = %(table)s
+    ORDER BY range_start;
+    """
+    table_range_query = """--sql
+    SELECT min("timestamp"), max("timestamp") + INTERVAL '1 minute'
+    FROM {};
+    """
+    cur = conn.cursor()
+    if timescale:
+        cur.execute(chunk_ranges_query, {"table": table})
+    else:
+        cur.execute(sql.SQL(table_range_query).format(sql.Identifier(table)))
+    ranges = [(start, end) for start, end in cur.fetchall() if start is not None]
+    cur.close()
+    conn.commit()
+    return ranges
+
+
+def convert_to_compact_schema(data_helper: DataHelper | None = None) -> None:
+    """
+    rewrites NUMERIC pair tables into compact hypertables chunk by chunk
+    and swaps them under lock; run it with the collector stopped
+    """
+    data_helper = data_helper or DataHelper()
+    pairs_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs;
+    """
+    copy_query = """--sql
+    INSERT INTO {compact} ("timestamp", "open", high, low, "close", volume)
+    SELECT "timestamp", "open"::DOUBLE PRECISION, high::DOUBLE PRECISION, low::DOUBLE PRECISION,
+           "close"::DOUBLE PRECISION, volume::DOUBLE PRECISION
+    FROM {table}
+    WHERE "timestamp" >= %(start)s AND "timestamp" < %(end)s
+    ON CONFLICT ("timestamp") DO NOTHING;
+    """
+    swap_query = """--sql
+    DROP TABLE {table} CASCADE;
+    ALTER TABLE {compact} RENAME TO {table};
+    ALTER INDEX {compact_index} RENAME TO {table_index};
+    """
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(pairs_query)
+        pairs = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT to_regclass('timescaledb_information.chunks')")
+        timescale = cur.fetchone()[0] is not None
+        conn.commit()
+        for pair in pairs:
+            table = f"ohlc_{pair}"
+            cur.execute("SELECT to_regclass(%s)", (table,))
+            if cur.fetchone()[0] is None or not data_helper.has_pair_id_column(conn, table):
+                continue
+            names = {
+                "table": sql.Identifier(table),
+                "compact": sql.Identifier(f"{table}_compact"),
+                "table_index": sql.Identifier(f"{table}_timestamp_key"),
+                "compact_index": sql.Identifier(f"{table}_compact_timestamp_key"),
+            }
+            data_helper.create_candle_table(conn, f"{table}_compact",
+                                            compact=True, compress_after_days=0)
+            ranges = chunk_ranges(conn, table, timescale)
+            for start, end in ranges:
+                cur.execute(sql.SQL(copy_query).format(**names), {"start": start, "end": end})
+                conn.commit()
+                logger.info(f"{table}: {cur.rowcount} candles from {start} converted")
+            cur.execute(sql.SQL("LOCK TABLE {table} IN EXCLUSIVE MODE;").format(**names))
+            # candles written since the last chunk was copied
+            cur.execute(sql.SQL(copy_query).format(**names),
+                        {"start": ranges[-1][0] if ranges else "-infinity", "end": "infinity"})
+            cur.execute(sql.SQL(swap_query).format(**names))
+            data_helper.forget_table_columns(table)
+            if timescale:
+                data_helper.create_continuous_aggregates(conn, pair)
+                data_helper.enable_compression(conn, table)
+            conn.commit()
+            logger.info(f"{table} converted to the compact schema")
+        cur.close()
+
+
+def consolidate_pair_tables(data_helper: DataHelper | None = None) -> None:
+    """
+    moves candles of every ohlc_<pair> table into the consolidated ohlc hypertable
+    chunk by chunk, one transaction per chunk; after a catch-up copy under lock
+    the pair table (and its continuous aggregates) is dropped.
+    Set OHLC_STORAGE=consolidated once done; run it with the collector stopped
+    """
+    data_helper = data_helper or DataHelper(storage=CONSOLIDATED_STORAGE)
+    pairs_query = """--sql
+    SELECT unique_pair_id, pair_url
+    FROM bitstamp_pairs;
+    """
+    copy_query = """--sql
+    INSERT INTO {consolidated} (unique_pair_id, "timestamp", "open", high, low, "close", volume)
+    SELECT {pair_id}, "timestamp", "open"::DOUBLE PRECISION, high::DOUBLE PRECISION,
+           low::DOUBLE PRECISION, "close"::DOUBLE PRECISION, volume::DOUBLE PRECISION
+    FROM {table}
+    WHERE "timestamp" >= %(start)s AND "timestamp" < %(end)s
+    ON CONFLICT (unique_pair_id, "timestamp") DO NOTHING;
+    """
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        data_helper.create_consolidated_table(conn)
+        cur.execute(pairs_query)
+        pairs = cur.fetchall()
+        cur.execute("SELECT to_regclass('timescaledb_information.chunks')")
+        timescale = cur.fetchone()[0] is not None
+        conn.commit()
+        for unique_pair_id, pair in pairs:
+            table = f"ohlc_{pair}"
+            cur.execute("SELECT to_regclass(%s)", (table,))
+            if cur.fetchone()[0] is None:
+                continue
+            pair_copy_query = sql.SQL(copy_query).format(
+                consolidated=sql.Identifier(CONSOLIDATED_TABLE),
+                pair_id=sql.Literal(unique_pair_id),
+                table=sql.Identifier(table),
+            )
+            ranges = chunk_ranges(conn, table, timescale)
+            for start, end in ranges:
+                cur.execute(pair_copy_query, {"start": start, "end": end})
+                conn.commit()
+                logger.info(f"{table}: {cur.rowcount} candles from {start} moved")
+            cur.execute(sql.SQL("LOCK TABLE {} IN EXCLUSIVE MODE;").format(sql.Identifier(table)))
+            cur.execute(pair_copy_query,
+                        {"start": ranges[-1][0] if ranges else "-infinity", "end": "infinity"})
+            cur.execute(sql.SQL("DROP TABLE {} CASCADE;").format(sql.Identifier(table)))
+            conn.commit()
+            logger.info(f"{table} moved to {CONSOLIDATED_TABLE}")
+        cur.close()
+
+
+def ensure_schema(data_helper: DataHelper | None = None) -> None:
+    """
+    adds the checkpoint and gap watermark columns and the consolidated table
+    if they are missing, raises MissingMigrationError if pair tables lack
+    the unique "timestamp" index
+    """
+    data_helper = data_helper or DataHelper()
+    columns_query = """--sql
+    SELECT column_name
+    FROM information_schema.columns
+    WHERE table_name = 'bitstamp_pairs'
+      AND column_name IN ('last_candle_unix', 'gap_scan_unix');
+    """
+    unindexed_query = """--sql
+    SELECT pair_url
+    FROM bitstamp_pairs
+    WHERE to_regclass(format('%I', 'ohlc_' || pair_url)) IS NOT NULL
+      AND NOT EXISTS (SELECT 1
+                      FROM pg_index
+                      WHERE indrelid = to_regclass(format('%I', 'ohlc_' || pair_url))
+                        AND indisunique);
+    """
+    with data_helper.connection() as conn:
+        cur = conn.cursor()
+        cur.execute(columns_query)
+        columns = {row[0] for row in cur.fetchall()}
+        unindexed = []
+        if data_helper.storage == PER_PAIR_STORAGE:
+            cur.execute(unindexed_query)
+            unindexed = [row[0] for row in cur.fetchall()]
+        else:
+            cur.execute("SELECT to_regclass(%s)", (CONSOLIDATED_TABLE,))
+            if cur.fetchone()[0] is None:
+                logger.info(f"Creating consolidated table {CONSOLIDATED_TABLE}")
+                data_helper.create_consolidated_table(conn)
+        cur.close()
+    if "last_candle_unix" not in columns:
+        logger.info("Applying migration checkpoints")
+        add_candle_checkpoints(data_helper)
+    if "gap_scan_unix" not in columns:
+        logger.info("Applying migration gap_watermarks")
+        add_gap_watermarks(data_helper)
+    if unindexed:
+        raise MissingMigrationError(
+            f"{len(unindexed)} pair tables (e.g. ohlc_{unindexed[0]}) have no unique "
+            "\"timestamp\" index, run: python -m data_manager.migrations deduplicate")
+
+
+MIGRATIONS = {
+    "checkpoints": add_candle_checkpoints,
+    "aggregates": add_continuous_aggregates,
+    "gap_watermarks": add_gap_watermarks,
+    "deduplicate": deduplicate_candles,
+    "compression": enable_compression,
+    "compact": convert_to_compact_schema,
+    "consolidate": consolidate_pair_tables,
+}
+
+
+def main() -> None:
+    """
+    runs the migration given on command line
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+    MIGRATIONS[args.migration]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+vectorized normalization of raw API candles:
+typed NumPy columns are built straight from the JSON payload
+instead of per-element pandas apply calls
+"""
+
+from operator import itemgetter
+import numpy as np
+import pandas as pd
+
+LOCAL_TZ = "Europe/Vilnius"
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+CANDLE_DTYPE = np.dtype([
+    ("timestamp", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("volume", np.float64),
+])
+
+
+def candles_to_array(ohlc_list: list[dict]) -> np.ndarray:
+    """
+    converts API candles (string values) into a CANDLE_DTYPE structured array
+    with int64 epoch seconds and float64 prices
+    """
+    count = len(ohlc_list)
+    candles = np.empty(count, dtype=CANDLE_DTYPE)
+    candles["timestamp"] = np.fromiter(map(int, map(itemgetter("timestamp"), ohlc_list)),
+                                       dtype=np.int64, count=count)
+    for column in PRICE_COLUMNS:
+        candles[column] = np.fromiter(map(float, map(itemgetter(column), ohlc_list)),
+                                      dtype=np.float64, count=count)
+    return candles
+
+
+def array_to_df(candles: np.ndarray, unique_pair_id: int | None = None) -> pd.DataFrame:
+    """
+    builds a candle dataframe from a CANDLE_DTYPE array,
+    epochs are converted to tz-aware timestamps in one pass
+    """
+    df = pd.DataFrame({column: candles[column] for column in PRICE_COLUMNS})
+    df.insert(0, "timestamp",
+              pd.to_datetime(candles["timestamp"], unit="s", utc=True).tz_convert(LOCAL_TZ))
+    if unique_pair_id is not None:
+        df["unique_pair_id"] = unique_pair_id
+    return df
+
+
+def df_to_array(df: pd.DataFrame) -> np.ndarray:
+    """
+    candle dataframe with tz-aware timestamps -> CANDLE_DTYPE array
+    """
+    candles = np.empty(len(df), dtype=CANDLE_DTYPE)
+    candles["timestamp"] = (df["timestamp"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    for column in PRICE_COLUMNS:
+        candles[column] = df[column].to_numpy(dtype=np.float64)
+    return candles
+
+
+def normalize_candles(ohlc_list: list[dict], unique_pair_id: int | None = None) -> pd.DataFrame:
+    """
+    raw API candles -> typed candle dataframe ready for insert_candles_to_db
+    """
+    return array_to_df(candles_to_array(ohlc_list), unique_pair_id)
@@ -0,0 +1,50 @@
+"""
+vectorized OHLCV resampling of one-minute CANDLE_DTYPE arrays into
+higher timeframes, matching the continuous aggregates kept on DB
+"""
+
+import numpy as np
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+# timeframe -> bucket length in seconds, every timeframe except the raw
+# one-minute candles has a continuous aggregate ohlc_<pair>_<timeframe>
+TIMEFRAMES = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "1d": 86400,
+}
+AGGREGATED_TIMEFRAMES = tuple(timeframe for timeframe in TIMEFRAMES if timeframe != "1m")
+
+
+def bucket_starts(timestamps: np.ndarray, bucket_seconds: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (bucket start epochs, index of the first candle of every bucket)
+    for time ordered epochs, buckets are aligned to the unix epoch like time_bucket()
+    """
+    buckets = timestamps - timestamps % bucket_seconds
+    first = np.flatnonzero(np.diff(buckets)) + 1
+    first = np.concatenate(([0], first)) if len(buckets) else first
+    return buckets[first], first
+
+
+def resample(candles: np.ndarray, timeframe: str) -> np.ndarray:
+    """
+    aggregates time ordered one-minute candles into `timeframe` candles:
+    first open, max high, min low, last close and summed volume per bucket,
+    NaN prices are skipped
+    """
+    bucket_seconds = TIMEFRAMES[timeframe]
+    buckets, first = bucket_starts(candles["timestamp"], bucket_seconds)
+    last = np.append(first[1:], len(candles)) - 1
+    resampled = np.empty(len(buckets), dtype=CANDLE_DTYPE)
+    resampled["timestamp"] = buckets
+    if not len(buckets):
+        return resampled
+    resampled["open"] = candles["open"][first]
+    resampled["high"] = np.fmax.reduceat(candles["high"], first)
+    resampled["low"] = np.fmin.reduceat(candles["low"], first)
+    resampled["close"] = candles["close"][last]
+    resampled["volume"] = np.add.reduceat(np.nan_to_num(candles["volume"]), first)
+    return resampled
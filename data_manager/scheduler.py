@@ -0,0 +1,112 @@
+"""
+long-running collector: runs the status sweep (with gap backfill) and the candle update
+on a fixed cadence aligned to minute boundaries, keeping DB pool,
+HTTP sessions and candle checkpoints warm between cycles
+"""
+
+import os
+import signal
+import threading
+import time
+from loguru import logger
+from dotenv import load_dotenv
+from data_manager import status_helper
+from data_manager.api_data_manager import APIDataManager
+from data_manager.metrics import METRICS_FILE, get_metrics
+
+load_dotenv()
+
+metrics = get_metrics()
+
+UPDATE_INTERVAL_MINUTES = int(os.getenv("UPDATE_INTERVAL_MINUTES", "1"))
+STATUS_INTERVAL_MINUTES = int(os.getenv("STATUS_INTERVAL_MINUTES", "60"))
+# Bitstamp needs a moment to close the candle of the previous minute
+TICK_DELAY_SECONDS = float(os.getenv("TICK_DELAY_SECONDS", "2"))
+
+
+def seconds_until_next_tick(interval_minutes: int, now: float | None = None) -> float:
+    """
+    seconds until the next multiple of `interval_minutes` (plus TICK_DELAY_SECONDS)
+    """
+    now = time.time() if now is None else now
+    interval = interval_minutes * 60
+    return interval - now % interval + TICK_DELAY_SECONDS
+
+
+class Scheduler:
+    """
+    runs collector cycles until stopped (SIGINT / SIGTERM or stop()),
+    rewriting `metrics_file` after every cycle
+    """
+    def __init__(self,
+                 api_data_manager: APIDataManager | None = None,
+                 update_interval: int = UPDATE_INTERVAL_MINUTES,
+                 status_interval: int = STATUS_INTERVAL_MINUTES,
+                 metrics_file: str | None = METRICS_FILE) -> None:
+        self.api_data_manager = api_data_manager or APIDataManager()
+        self.update_interval = update_interval
+        self.status_interval = status_interval
+        self.metrics_file = metrics_file
+        self._stop = threading.Event()
+        self._last_status_sweep: float | None = None
+
+
+    def stop(self, *_) -> None:
+        """
+        finishes the running cycle and exits the loop
+        """
+        logger.info("Stopping collector daemon")
+        self._stop.set()
+
+
+    def status_sweep_due(self, now: float) -> bool:
+        """
+        True on the first cycle and once per status interval afterwards
+        """
+        return (self._last_status_sweep is None
+                or now - self._last_status_sweep >= self.status_interval * 60 - TICK_DELAY_SECONDS)
+
+
+    def run_cycle(self) -> None:
+        """
+        a single collector cycle: optional status sweep, then incremental candle update
+        and, after a status sweep, backfill of the gaps found since the previous one
+        """
+        started = time.time()
+        status_sweep = self.status_sweep_due(started)
+        with metrics.span("cycle", status_sweep=status_sweep):
+            if status_sweep:
+                self._last_status_sweep = started
+                with metrics.span("stage", stage="reconcile"):
+                    pairs_changed = status_helper.reconcile_pairs()
+                with metrics.span("stage", stage="discover"):
+                    discovered = self.api_data_manager.find_starting_timestamp_for_new_pairs()
+                if pairs_changed or discovered:
+                    self.api_data_manager.reset_checkpoints()
+            with metrics.span("stage", stage="update"):
+                self.api_data_manager.update_candles_for_existing_pairs()
+            if status_sweep:
+                with metrics.span("stage", stage="backfill"):
+                    self.api_data_manager.gap_scanner.run()
+        logger.info(f"Cycle finished in {time.time() - started:.2f}s")
+
+
+    def run(self) -> None:
+        """
+        runs cycles on minute-aligned ticks until stopped,
+        a failed cycle is logged and the next tick runs as usual
+        """
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        logger.info(f"Collector daemon started: candles every {self.update_interval} min, "
+                    f"status every {self.status_interval} min")
+        while not self._stop.wait(seconds_until_next_tick(self.update_interval)):
+            try:
+                self.run_cycle()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Collector cycle failed")
+                self.api_data_manager.reset_checkpoints()
+                metrics.inc("cycles_failed_total")
+            if self.metrics_file:
+                metrics.write(self.metrics_file)
+        self.api_data_manager.api_client.latency.log_summary()
@@ -0,0 +1,168 @@
+"""
+discovery of the first trading minute of pairs:
+known start dates are seeded from the shipped start dates file and a local cache,
+unknown pairs are searched concurrently with full-page probes
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from loguru import logger
+import aiohttp
+from dotenv import load_dotenv
+from data_manager.candle_fetcher import (
+    AsyncCandleFetcher,
+    CANDLE_STEP,
+    PAGE_INTERVAL,
+    PairNotFoundError,
+)
+
+load_dotenv()
+
+# tracked in the repository and only read
+SHIPPED_START_DATES = Path(__file__).resolve().parent.parent / "pairs_start_dates.csv"
+# discovered start dates, kept out of the repository
+START_DATES_CACHE = Path(os.getenv(
+    "START_DATES_CACHE",
+    Path(__file__).resolve().parent.parent / ".cache" / "pairs_start_dates.csv"))
+# 2024-09-14 09:36:50+03 (earliest known complete data)
+EARLIEST_SEARCH_TIMESTAMP = 1726292210
+
+
+def pair_to_url(pair: str) -> str:
+    """
+    "BTC/USD" -> "btcusd"
+    """
+    return pair.replace("/", "").lower()
+
+
+def load_start_cache(path: Path = START_DATES_CACHE) -> dict[str, int]:
+    """
+    reads {pair_url: unix_timestamp} from a "|pair|timestamp|unix_timestamp" file
+    """
+    if not path.exists():
+        return {}
+    start_dates: dict[str, int] = {}
+    with path.open(encoding="utf-8") as cache_file:
+        for line in cache_file:
+            fields = line.strip().split("|")
+            if len(fields) != 4 or not fields[3].isdigit():
+                continue
+            start_dates[pair_to_url(fields[1])] = int(fields[3])
+    return start_dates
+
+
+def append_start_cache(start_dates: dict[str, int], path: Path = START_DATES_CACHE) -> None:
+    """
+    appends newly discovered start dates to the cache file,
+    which is created with the header of the shipped file
+    """
+    if not start_dates:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    row_number = len(load_start_cache(path))
+    with path.open("a", encoding="utf-8") as cache_file:
+        if row_number == 0 and path.stat().st_size == 0:
+            cache_file.write("|pair|timestamp|unix_timestamp")
+        for pair, unix_timestamp in start_dates.items():
+            row_number += 1
+            readable = datetime.fromtimestamp(unix_timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            cache_file.write(f"\n{row_number}|{pair}|{readable}|{unix_timestamp}")
+
+
+class StartDiscovery:
+    """
+    finds the first candle of pairs; every probe asks for a full page,
+    so a probe that straddles the listing minute answers the search at once
+    and other probes cut the range by a page instead of a single minute
+    """
+    def __init__(self,
+                 candle_fetcher: AsyncCandleFetcher,
+                 cache_path: Path = START_DATES_CACHE) -> None:
+        self.candle_fetcher = candle_fetcher
+        self.cache_path = cache_path
+        self._probes: dict[tuple[str, int], int | None] = {}
+
+
+    async def probe(self,
+                    session: aiohttp.ClientSession,
+                    semaphore: asyncio.Semaphore,
+                    pair: str,
+                    start: int) -> int | None:
+        """
+        timestamp of the first candle in [start, start + PAGE_INTERVAL)
+        or None if the page is empty; results are memoized
+        """
+        key = (pair, start)
+        if key not in self._probes:
+            page = await self.candle_fetcher.fetch_page(session, semaphore, pair, start)
+            self._probes[key] = int(page[0]["timestamp"]) if page else None
+        return self._probes[key]
+
+
+    async def search(self,
+                     session: aiohttp.ClientSession,
+                     semaphore: asyncio.Semaphore,
+                     pair: str,
+                     low: int,
+                     high: int) -> int | None:
+        """
+        binary search over page-sized windows for the first candle in [low, high),
+        assumes the pair has not traded before `low`
+        """
+        low += -low % CANDLE_STEP  # candles are minute aligned
+        while high - low > PAGE_INTERVAL:
+            mid = low + (high - low) // 2 // CANDLE_STEP * CANDLE_STEP
+            first = await self.probe(session, semaphore, pair, mid)
+            if first is None:
+                low = mid + PAGE_INTERVAL  # listed after this window
+            elif first > mid:
+                return first  # window straddles the listing minute
+            else:
+                high = mid  # already traded at mid
+        return await self.probe(session, semaphore, pair, low)
+
+
+    async def discover(self, pairs: list[str], end: int) -> dict[str, int]:
+        """
+        searches all given pairs concurrently, pairs unknown to API are skipped
+        """
+        semaphore = asyncio.Semaphore(self.candle_fetcher.concurrency)
+        async with self.candle_fetcher.session() as session:
+            searches = await asyncio.gather(
+                *(self.search(session, semaphore, pair, EARLIEST_SEARCH_TIMESTAMP, end)
+                  for pair in pairs),
+                return_exceptions=True)
+        start_dates: dict[str, int] = {}
+        for pair, result in zip(pairs, searches):
+            if isinstance(result, PairNotFoundError):
+                logger.error(f"Bad status code for {pair}")
+            elif isinstance(result, BaseException):
+                logger.error(f"Start timestamp search failed for {pair}: {result!r}")
+            elif result is None:
+                logger.info(f"No candles found for {pair}")
+            else:
+                start_dates[pair] = result
+        return start_dates
+
+
+    def run(self, pairs: list[str], end: int) -> dict[str, int]:
+        """
+        {pair_url: first candle unix timestamp}: known pairs are answered
+        from the shipped file and the cache, the rest is discovered and added to the cache
+        """
+        cached = {**load_start_cache(SHIPPED_START_DATES), **load_start_cache(self.cache_path)}
+        start_dates = {pair: cached[pair] for pair in pairs if pair in cached}
+        unknown = [pair for pair in pairs if pair not in cached]
+        if unknown:
+            started = time.perf_counter()
+            requests_before = self.candle_fetcher.requests_sent
+            discovered = self.candle_fetcher.run_until_complete(self.discover(unknown, end))
+            logger.info(f"Discovered {len(discovered)}/{len(unknown)} start timestamps with "
+                        f"{self.candle_fetcher.requests_sent - requests_before} requests "
+                        f"in {time.perf_counter() - started:.2f}s")
+            append_start_cache(discovered, self.cache_path)
+            start_dates.update(discovered)
+        return start_dates
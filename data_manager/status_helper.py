@@ -3,69 +3,53 @@ This module cotains functions that execute initial comparison between local
 database and Bitstamp API provided data
 """
 
-import datetime
-import time
 from loguru import logger
-import pandas as pd
 from dotenv import load_dotenv
-import requests
-import pytz
+from .api_client import get_client
 from .data_helper import DataHelper
 
 load_dotenv()
 
-API_PAIRS_URL = "https://www.bitstamp.net/api/v2/trading-pairs-info/"
-cur_time = datetime.datetime.now(pytz.timezone(
-    "Europe/Vilnius")).replace(microsecond=0)
-cur_unix_time = int(time.mktime(cur_time.timetuple()))
+# connections come from DataHelper's shared pool, so one helper serves the whole module
+data_helper = DataHelper()
 
 
-def check_for_new_pairs() -> None:
+def compare_pairs(api_pairs: list[dict],
+                  db_rows: list[tuple]) -> tuple[list[dict], list[str], list[str]]:
     """
-    if API returns traded pairs that do not exist on DB,
-    adds them to DB.
-    Plus, updates DB table for las_checked_for_trading column
-    for all pairs that API returned as traded
+    splits pairs into (new on API, disabled on API, unchanged)
+    with set differences of API url symbols and DB pair urls
     """
-    db_df = DataHelper().retrieve_trading_status_from_db
-    # pylint: disable=unsubscriptable-object
-    # pylint: disable=singleton-comparison
-    enabled_db_pairs = db_df.loc[db_df["trading_enabled"] == True, "pair_url"].to_list()
-    resp = requests.get(API_PAIRS_URL, timeout=(3, None))
-    api_results = resp.json()
-    if len(api_results) > len(enabled_db_pairs):
+    api_index = {pair["url_symbol"]: pair for pair in api_pairs}
+    db_pairs = {row[0] for row in db_rows}
+    enabled_db_pairs = {row[0] for row in db_rows if row[1]}
+    new_pairs = [api_index[pair] for pair in sorted(api_index.keys() - db_pairs)]
+    disabled_pairs = sorted(enabled_db_pairs - api_index.keys())
+    unchanged_pairs = sorted(enabled_db_pairs & api_index.keys())
+    return new_pairs, disabled_pairs, unchanged_pairs
+
+
+def reconcile_pairs() -> bool:
+    """
+    adds new API pairs to DB, disables pairs API no longer returns and updates
+    check times from one API snapshot and one DB read; True if any pair changed
+    """
+    api_pairs = get_client().get_trading_pairs_snapshot()
+    db_rows = data_helper.retrieve_trading_status_rows
+    new_pairs, disabled_pairs, unchanged_pairs = compare_pairs(api_pairs, db_rows)
+    if new_pairs:
         logger.info("New trading pairs have been launched")
-        new_pairs = [pair for pair in api_results if pair["url_symbol"] not in enabled_db_pairs]
         logger.info("New pairs are the following:")
-        new_pairs_list = [pair["url_symbol"] for pair in new_pairs]
-        logger.info(f"{new_pairs_list}")
-        for pair in api_results:
-            DataHelper().update_check_time(pair["url_symbol"])
-        DataHelper().insert_new_pairs_to_main_table(new_pairs)
+        logger.info(f"{[pair['url_symbol'] for pair in new_pairs]}")
+        data_helper.insert_new_pairs_to_main_table(new_pairs)
     else:
         logger.info("No new pairs have been launched since the last check")
-
-def update_disabled_pairs() -> None:
-    """
-    existing pairs in database are checked for trading status on API
-    - if enabled on DB and API does not return any data for specific pair,
-    disable trading status function is executed.
-    Plus, last_checked_for_trading column value is updated with current time
-    """
-    existing_pairs: pd.DataFrame = DataHelper().retrieve_trading_status_from_db
-    api_pairs: list[str] = []
-    api_data = requests.get(url=API_PAIRS_URL, timeout=(3, None)).json()
-    for pair in api_data:
-        api_pairs.append(pair["url_symbol"])
-    # pylint: disable=unsubscriptable-object
-    disabled_pairs = existing_pairs.loc[(~existing_pairs['pair_url'].isin(api_pairs))
-    & (existing_pairs['trading_enabled'] is True),
-    ['pair_url', 'trading_enabled', 'last_checked_for_trading']]
-    if not disabled_pairs.empty:
+    if disabled_pairs:
         logger.info("disabled pairs:")
         logger.info(f"{disabled_pairs}")
-        for pair in disabled_pairs['pair_url']:
-            DataHelper().disable_trading_on_db(pair)
-            DataHelper().update_check_time(pair)
-    elif disabled_pairs.empty:
+        data_helper.disable_pairs(disabled_pairs)
+    else:
         logger.info("None of previously traded pairs were disabled since the last check.")
+    data_helper.update_check_times([pair["url_symbol"] for pair in api_pairs])
+    logger.info(f"{len(unchanged_pairs)} pairs unchanged")
+    return bool(new_pairs or disabled_pairs)
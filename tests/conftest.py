@@ -0,0 +1,18 @@
+"""
+fixtures shared by the unit tests
+"""
+
+import pytest
+from data_manager.api_client import LatencyStats
+from data_manager.candle_fetcher import AsyncCandleFetcher, TokenBucket
+
+
+@pytest.fixture
+def fetcher():
+    """
+    candle fetcher without a practical rate limit, pointed at a mock by the test
+    """
+    candle_fetcher = AsyncCandleFetcher(rate_limiter=TokenBucket(1000, 1000),
+                                        latency=LatencyStats())
+    yield candle_fetcher
+    candle_fetcher.close()
@@ -0,0 +1,22 @@
+"""
+candle data shared by the unit tests
+"""
+
+import numpy as np
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+
+# 2024-01-01 00:00:00 UTC
+START = 1704067200
+
+
+def make_candles(timestamps, price: float = 1.0) -> np.ndarray:
+    """
+    CANDLE_DTYPE rows with open / close counting up from `price`
+    """
+    candles = np.zeros(len(timestamps), dtype=CANDLE_DTYPE)
+    candles["timestamp"] = timestamps
+    candles["open"] = candles["close"] = np.arange(len(timestamps)) + price
+    candles["high"] = candles["open"] + 1
+    candles["low"] = candles["open"] - 1
+    candles["volume"] = 1.0
+    return candles
@@ -0,0 +1,29 @@
+"""
+unit tests of the memory-mapped candle cache
+"""
+
+import numpy as np
+from data_manager.candle_cache import CandleCache
+from data_manager.candle_fetcher import CANDLE_STEP
+from tests.helpers import START, make_candles
+
+
+def test_candle_cache_round_trip(tmp_path):
+    cache = CandleCache(tmp_path)
+    candles = make_candles(np.arange(START, START + 5 * CANDLE_STEP, CANDLE_STEP))
+    cache.write("btcusd", candles)
+    cached = cache.read("btcusd", START, START + 5 * CANDLE_STEP)
+    assert isinstance(cached, np.memmap)
+    assert cached.tolist() == candles.tolist()
+    assert cache.read("ethusd", START, START + 60).size == 0
+
+
+def test_candle_cache_across_months_with_holes(tmp_path):
+    cache = CandleCache(tmp_path)
+    # last minute of 2023 and the first two of 2024, without the second one
+    candles = make_candles([START - 60, START, START + 120])
+    cache.write("btcusd", candles)
+    cache.write("btcusd", make_candles([START], price=7.0))
+    cached = cache.read("btcusd", START - 120, START + 180)
+    assert cached["timestamp"].tolist() == [START - 60, START, START + 120]
+    assert cached["open"].tolist() == [1.0, 7.0, 3.0]
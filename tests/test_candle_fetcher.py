@@ -0,0 +1,79 @@
+"""
+streaming tests of the async candle fetcher against the mock Bitstamp API
+"""
+
+import asyncio
+from contextlib import aclosing
+from benchmarks.mock_bitstamp import MockBitstamp
+from data_manager.candle_fetcher import PAGE_INTERVAL
+from tests.helpers import START
+
+PAIRS = [f"pair{i}usd" for i in range(6)]
+PAGES = 3
+
+
+def page_starts() -> list[int]:
+    """
+    starts of the PAGES pages every pair is streamed over
+    """
+    return [START + page * PAGE_INTERVAL for page in range(PAGES)]
+
+
+def stream(fetcher, pairs, sink, done=None, buffer_pages=2):
+    """
+    stream_pages of `pairs` over PAGES pages, failing instead of hanging on a deadlock
+    """
+    fetcher.run_until_complete(asyncio.wait_for(
+        fetcher.stream_pages({pair: page_starts() for pair in pairs}, sink,
+                             done=done, buffer_pages=buffer_pages),
+        timeout=20))
+
+
+def test_more_pairs_than_buffer_slots(fetcher):
+    written: dict[str, list[int]] = {pair: [] for pair in PAIRS}
+    finished: list[str] = []
+    with MockBitstamp(dict.fromkeys(PAIRS, START), now=START + PAGES * PAGE_INTERVAL,
+                      latency=0.01) as mock:
+        fetcher.ohlc_url = mock.ohlc_url
+        stream(fetcher, PAIRS,
+               lambda pair, page: written[pair].append(int(page[0]["timestamp"])),
+               done=finished.append)
+    assert all(starts == page_starts() for starts in written.values())
+    assert sorted(finished) == PAIRS
+
+
+def test_unknown_pair_and_failing_sink(fetcher):
+    written: dict[str, list] = {}
+    finished: list[str] = []
+
+    def sink(pair, page):
+        if pair == PAIRS[0]:
+            raise RuntimeError("DB down")
+        written.setdefault(pair, []).append(page)
+
+    with MockBitstamp(dict.fromkeys(PAIRS, START), now=START + PAGES * PAGE_INTERVAL) as mock:
+        fetcher.ohlc_url = mock.ohlc_url
+        stream(fetcher, PAIRS + ["gonusd"], sink, done=finished.append)
+    assert written.pop("gonusd") == [None]
+    assert PAIRS[0] not in written
+    assert all(len(pages) == PAGES for pages in written.values())
+    assert sorted(finished) == PAIRS[1:]
+
+
+def test_closing_a_pair_releases_its_buffer_slots(fetcher):
+    async def take_first_page(buffer: asyncio.Semaphore) -> list[dict]:
+        async with fetcher.session() as session:
+            pages = fetcher.iter_pages(session, asyncio.Semaphore(4), buffer,
+                                       PAIRS[0], page_starts())
+            async with aclosing(pages):
+                page = await anext(pages)
+        buffer.release()
+        # every slot is free again once the prefetched pages are cancelled
+        await asyncio.wait_for(asyncio.gather(*(buffer.acquire() for _ in range(PAGES))), 1)
+        return page
+
+    with MockBitstamp({PAIRS[0]: START}, now=START + PAGES * PAGE_INTERVAL,
+                      latency=0.05) as mock:
+        fetcher.ohlc_url = mock.ohlc_url
+        page = fetcher.run_until_complete(take_first_page(asyncio.Semaphore(PAGES)))
+    assert int(page[0]["timestamp"]) == START
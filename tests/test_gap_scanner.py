@@ -0,0 +1,91 @@
+"""
+unit tests of gap detection and backfill page planning
+"""
+
+import numpy as np
+from data_manager.candle_fetcher import CANDLE_STEP, PAGE_INTERVAL
+from data_manager.gap_scanner import GapScanner, find_gaps, gap_pages, in_gaps
+from tests.helpers import START
+
+DAY = 86400
+
+
+def test_find_gaps_without_missing_minutes():
+    timestamps = np.arange(START, START + 10 * CANDLE_STEP, CANDLE_STEP)
+    assert find_gaps(timestamps, START, START + 10 * CANDLE_STEP).shape == (0, 2)
+
+
+def test_find_gaps_at_edges_and_inside():
+    timestamps = np.array([START + 60, START + 120, START + 300])
+    gaps = find_gaps(timestamps, START, START + 420)
+    assert gaps.tolist() == [[START, START + 60],
+                             [START + 180, START + 300],
+                             [START + 360, START + 420]]
+
+
+def test_find_gaps_of_empty_range():
+    gaps = find_gaps(np.array([], dtype=np.int64), START, START + 600)
+    assert gaps.tolist() == [[START, START + 600]]
+
+
+def test_gap_pages_merges_gaps_within_a_page():
+    gaps = np.array([[START, START + 60], [START + 600, START + 660]])
+    assert gap_pages(gaps) == [START]
+
+
+def test_gap_pages_splits_long_gaps():
+    gaps = np.array([[START, START + 2 * PAGE_INTERVAL + 60],
+                     [START + 5 * PAGE_INTERVAL, START + 5 * PAGE_INTERVAL + 60]])
+    assert gap_pages(gaps) == [START,
+                               START + PAGE_INTERVAL,
+                               START + 2 * PAGE_INTERVAL,
+                               START + 5 * PAGE_INTERVAL]
+
+
+def test_gap_pages_without_gaps():
+    assert not gap_pages(np.empty((0, 2), dtype=np.int64))
+
+
+def test_in_gaps():
+    gaps = np.array([[START + 60, START + 180], [START + 300, START + 360]])
+    timestamps = np.arange(START, START + 420, CANDLE_STEP)
+    assert in_gaps(timestamps, gaps).tolist() == [False, True, True, False,
+                                                  False, True, False]
+    assert not in_gaps(timestamps, np.empty((0, 2), dtype=np.int64)).any()
+
+
+class ChunkStats:
+    """
+    data helper answering chunk row counts only
+    """
+    def __init__(self, chunks: list[tuple[int, int, int]]) -> None:
+        self.chunks = chunks
+
+
+    def retrieve_chunk_row_counts(self, pair: str, start: int, end: int):
+        """
+        the chunks overlapping [start, end)
+        """
+        return [chunk for chunk in self.chunks if chunk[1] > start and chunk[0] < end]
+
+
+def scan_windows(chunks, start, end):
+    """
+    scan windows of [start, end) over the given chunk statistics
+    """
+    scanner = GapScanner(ChunkStats(chunks), candle_fetcher=object())
+    return scanner.scan_windows("btcusd", start, end)
+
+
+def test_scan_windows_skips_complete_chunks_inside_the_range():
+    chunks = [(START, START + DAY, DAY // 60), (START + DAY, START + 2 * DAY, DAY // 60 - 5)]
+    assert scan_windows(chunks, START, START + 2 * DAY) == [(START + DAY, START + 2 * DAY)]
+
+
+def test_scan_windows_reads_chunks_clipped_by_the_range():
+    # a 6 day chunk with a two hour hole, scanned from its fifth day on:
+    # its row count exceeds the minutes of the clipped range, but the hole may lie there
+    chunks = [(START, START + 6 * DAY, 6 * DAY // 60 - 120)]
+    assert scan_windows(chunks, START + 5 * DAY, START + 6 * DAY) == [
+        (START + 5 * DAY, START + 6 * DAY)]
+    assert scan_windows(chunks, START, START + 5 * DAY) == [(START, START + 5 * DAY)]
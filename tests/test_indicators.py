@@ -0,0 +1,60 @@
+"""
+incremental indicator results against a full recomputation
+"""
+
+import numpy as np
+from data_manager.indicators import IndicatorEngine, IndicatorSet
+from data_manager.metrics import METRICS_PREFIX, get_metrics
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+from tests.helpers import START
+
+
+def random_walk(count: int, seed: int = 0) -> np.ndarray:
+    """
+    CANDLE_DTYPE candles of a random walk, one per minute
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, count)))
+    open_ = np.concatenate(([100.0], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0005, count)) * close
+    candles = np.empty(count, dtype=CANDLE_DTYPE)
+    candles["timestamp"] = START + 60 * np.arange(count)
+    candles["open"] = open_
+    candles["close"] = close
+    candles["high"] = np.maximum(open_, close) + spread
+    candles["low"] = np.minimum(open_, close) - spread
+    candles["volume"] = rng.exponential(2.0, count)
+    return candles
+
+
+def test_batches_match_full_computation():
+    candles = random_walk(2 * 1440 + 17)
+    full = IndicatorSet().update(candles)
+    engine = IndicatorEngine()
+    # uneven batches, some shorter than the indicator periods
+    bounds = [0, 1, 7, 150, 151, 1500, 2880, len(candles)]
+    parts = np.concatenate([engine.update("btcusd", candles[start:end])
+                            for start, end in zip(bounds, bounds[1:])])
+    assert parts["timestamp"].tolist() == full["timestamp"].tolist()
+    for name in full.dtype.names[1:]:
+        np.testing.assert_allclose(parts[name], full[name], rtol=1e-9, atol=1e-9,
+                                   err_msg=name)
+
+
+def test_already_seen_candles_are_ignored():
+    candles = random_walk(300)
+    engine = IndicatorEngine()
+    engine.update("btcusd", candles[:200])
+    assert len(engine.update("btcusd", candles[150:])) == 100
+
+
+def test_latest_values_are_exported_as_gauges():
+    candles = random_walk(150, seed=1)
+    engine = IndicatorEngine()
+    engine.update("ethusd", candles)
+    latest = engine.latest()["ethusd"]
+    rendered = get_metrics().render()
+    assert (f'{METRICS_PREFIX}indicator_value{{indicator="sma_20",pair="ethusd"}} '
+            f'{latest["sma_20"]:.17g}') in rendered
+    # not enough candles for a 200 minute average yet
+    assert 'indicator="sma_200",pair="ethusd"' not in rendered
@@ -0,0 +1,42 @@
+"""
+unit tests of live one-minute bar building
+"""
+
+from data_manager.candle_fetcher import CANDLE_STEP
+from data_manager.live_stream import BAR_CLOSE_DELAY, BarBuilder
+from tests.helpers import START
+
+
+def test_bar_builder_folds_trades_of_a_minute():
+    builder = BarBuilder()
+    assert builder.add_trade(START + 1, 10.0, 1.0) is None
+    assert builder.add_trade(START + 20, 12.0, 0.5) is None
+    assert builder.add_trade(START + 40, 9.0, 0.5) is None
+    bar = builder.add_trade(START + 61, 11.0, 2.0)
+    assert bar == (START, 10.0, 12.0, 9.0, 9.0, 2.0)
+    assert builder.bar == [START + 60, 11.0, 11.0, 11.0, 11.0, 2.0]
+
+
+def test_bar_builder_drops_trades_of_closed_minutes():
+    builder = BarBuilder()
+    builder.add_trade(START + 1, 10.0, 1.0)
+    builder.add_trade(START + 61, 11.0, 1.0)
+    assert builder.add_trade(START + 30, 99.0, 1.0) is None
+    assert builder.bar[1:] == [11.0, 11.0, 11.0, 11.0, 1.0]
+
+
+def test_bar_builder_drops_late_trades_of_earlier_minutes():
+    builder = BarBuilder()
+    builder.add_trade(START + 61, 11.0, 1.0)
+    assert builder.add_trade(START + 30, 99.0, 1.0) is None
+    assert builder.bar == [START + 60, 11.0, 11.0, 11.0, 11.0, 1.0]
+
+
+def test_bar_builder_closes_after_delay():
+    builder = BarBuilder()
+    builder.add_trade(START + 1, 10.0, 1.0)
+    assert builder.close_before(START + CANDLE_STEP + BAR_CLOSE_DELAY - 0.01) is None
+    assert builder.close_before(START + CANDLE_STEP + BAR_CLOSE_DELAY) == (
+        START, 10.0, 10.0, 10.0, 10.0, 1.0)
+    assert builder.bar is None
+    assert builder.close_before(START + 3600) is None
@@ -0,0 +1,25 @@
+"""
+unit tests of the NumPy resampler
+"""
+
+import numpy as np
+from data_manager.candle_fetcher import CANDLE_STEP
+from data_manager.ohlc_normalizer import CANDLE_DTYPE
+from data_manager.resampler import resample
+from tests.helpers import START, make_candles
+
+
+def test_resample():
+    candles = make_candles(np.arange(START, START + 10 * CANDLE_STEP, CANDLE_STEP))
+    candles["high"][2] = np.nan
+    resampled = resample(candles, "5m")
+    assert resampled["timestamp"].tolist() == [START, START + 300]
+    assert resampled["open"].tolist() == [1.0, 6.0]
+    assert resampled["close"].tolist() == [5.0, 10.0]
+    assert resampled["high"].tolist() == [6.0, 11.0]
+    assert resampled["low"].tolist() == [0.0, 5.0]
+    assert resampled["volume"].tolist() == [5.0, 5.0]
+
+
+def test_resample_of_no_candles():
+    assert len(resample(np.empty(0, dtype=CANDLE_DTYPE), "1h")) == 0
@@ -0,0 +1,47 @@
+"""
+first trading minute search against the mock Bitstamp API
+"""
+
+from benchmarks.mock_bitstamp import MockBitstamp
+from data_manager.candle_fetcher import PAGE_INTERVAL
+from data_manager.start_discovery import (
+    EARLIEST_SEARCH_TIMESTAMP,
+    StartDiscovery,
+    load_start_cache,
+)
+
+NOW = EARLIEST_SEARCH_TIMESTAMP // 60 * 60 + 400 * 86400
+LISTINGS = {
+    # on a page boundary counted from the search start
+    "pageusd": EARLIEST_SEARCH_TIMESTAMP // 60 * 60 + 60 + 4 * PAGE_INTERVAL,
+    # 37 minutes into a page
+    "midusd": (EARLIEST_SEARCH_TIMESTAMP + 200 * 86400) // 60 * 60 + 37 * 60,
+    # listed just before now
+    "lateusd": NOW - 5 * 60,
+    # traded before the search start, found at the first minute searched
+    "oldusd": EARLIEST_SEARCH_TIMESTAMP - 86400,
+}
+
+
+def test_discover_first_trading_minutes(fetcher, tmp_path):
+    cache_path = tmp_path / "start_dates.csv"
+    with MockBitstamp(LISTINGS, now=NOW) as mock:
+        fetcher.ohlc_url = mock.ohlc_url
+        discovery = StartDiscovery(fetcher, cache_path=cache_path)
+        start_dates = discovery.run([*LISTINGS, "gonusd"], NOW)
+        probes = mock.ohlc_request_count
+    assert start_dates == {**LISTINGS, "oldusd": EARLIEST_SEARCH_TIMESTAMP // 60 * 60 + 60}
+    assert load_start_cache(cache_path) == start_dates
+    # a binary search over page-sized windows, not a scan of every page
+    assert probes < 5 * 20
+
+
+def test_cached_pairs_are_not_searched(fetcher, tmp_path):
+    cache_path = tmp_path / "start_dates.csv"
+    with MockBitstamp(LISTINGS, now=NOW) as mock:
+        fetcher.ohlc_url = mock.ohlc_url
+        StartDiscovery(fetcher, cache_path=cache_path).run(["midusd"], NOW)
+        searched = mock.ohlc_request_count
+        assert StartDiscovery(fetcher, cache_path=cache_path).run(["midusd"], NOW) == {
+            "midusd": LISTINGS["midusd"]}
+        assert mock.ohlc_request_count == searched
@@ -0,0 +1,14 @@
+"""
+unit tests of the pair reconciliation logic
+"""
+
+from data_manager.status_helper import compare_pairs
+
+
+def test_compare_pairs():
+    api_pairs = [{"url_symbol": "btcusd"}, {"url_symbol": "ethusd"}, {"url_symbol": "solusd"}]
+    db_rows = [("btcusd", True), ("xrpusd", True), ("solusd", False), ("ltcusd", False)]
+    new_pairs, disabled_pairs, unchanged_pairs = compare_pairs(api_pairs, db_rows)
+    assert new_pairs == [{"url_symbol": "ethusd"}]
+    assert disabled_pairs == ["xrpusd"]
+    assert unchanged_pairs == ["btcusd"]